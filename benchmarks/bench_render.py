@@ -0,0 +1,396 @@
+"""Headless benchmarks for the render pipeline.
+
+Everything runs against an in-memory strip, so no hardware is needed. Results
+are written as JSON and compared with a stored baseline; any benchmark that is
+slower than its baseline by more than the tolerance fails the run.
+
+    uv run python benchmarks/bench_render.py                    # compare
+    uv run python benchmarks/bench_render.py --update-baseline  # re-record
+
+Baselines are machine specific: record one on the machine you compare on.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from led import controller as controller_module  # noqa: E402
+from led.animations import Blink, Chase, FadeInOut, Flare, Rainbow  # noqa: E402
+from led.cache import SEQUENCES  # noqa: E402
+from led.models import Layout, SegmentDefinition, Table, TableSide  # noqa: E402
+from led.output import FrameOutput  # noqa: E402
+from led.patterns import Blink as BlinkPattern  # noqa: E402
+from led.patterns import Fade, Solid, interpolate_color  # noqa: E402
+from led.patterns import Rainbow as RainbowPattern  # noqa: E402
+from led.strip import StripSegment  # noqa: E402
+
+HERE = Path(__file__).resolve().parent
+BASELINE = HERE / "baseline.json"
+SIZES = [30, 300, 1000, 10000]
+SEGMENT_WIDTH = 25  # LEDs per segment in layout and controller benchmarks
+FRAMES_PER_SAMPLE = 20
+ANIMATIONS = [Chase, FadeInOut, Flare, Blink, Rainbow]
+
+
+class HeadlessStrip:
+    """In-memory stand-in for rpi_ws281x.PixelStrip."""
+
+    def __init__(self, num, *args, **kwargs):
+        self.num = num
+        self._led_data = [0] * num
+
+    def begin(self):
+        pass
+
+    def show(self):
+        pass
+
+    def numPixels(self):
+        return self.num
+
+    def setPixelColor(self, n, color):
+        if 0 <= n < self.num:
+            self._led_data[n] = color
+
+    def getPixelColorRGBW(self, n):
+        c = self._led_data[n]
+        return ((c >> 16) & 0xFF, (c >> 8) & 0xFF, c & 0xFF, (c >> 24) & 0xFF)
+
+
+def reference() -> float:
+    """Best time of a fixed pure Python workload, used to normalize results.
+
+    Shared machines (and Pis under thermal throttling) change speed between
+    runs; comparing each benchmark relative to this keeps the check honest.
+    """
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        total = 0
+        for i in range(20000):
+            total += i * i
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(fn, setup=None, repeat=7, number=None, per=1):
+    """Median seconds per operation over ``repeat`` samples.
+
+    ``setup`` builds fresh state for every call outside the timed region, and
+    ``fn`` receives it. ``per`` divides each call's time when ``fn`` does
+    several operations.
+    """
+    if number is None:
+        # Calibrate so each sample takes around 20 milliseconds
+        state = setup() if setup else None
+        start = time.perf_counter()
+        fn(state)
+        elapsed = time.perf_counter() - start
+        number = max(1, min(1000, int(0.02 / max(elapsed, 1e-9))))
+        if setup:
+            number = min(number, 20)
+
+    samples = []
+    for _ in range(repeat):
+        states = [setup() if setup else None for _ in range(number)]
+        # Like timeit, keep the garbage collector out of the timed region
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for state in states:
+                fn(state)
+            samples.append((time.perf_counter() - start) / number / per)
+        finally:
+            gc.enable()
+    return statistics.median(samples), min(samples), reference()
+
+
+def table_for(size: int) -> Table:
+    ppm = 60
+    side_len = size / 4 / ppm
+    table = Table("bench", side_len, side_len, ppm)
+    for order in range(4):
+        table.sides.append(TableSide(f"side_{order}", side_len, order))
+    table.recalculate_geometry()
+    return table
+
+
+def layout_for(table: Table) -> Layout:
+    layout = Layout("bench", table.name)
+    for side in table.sides:
+        for order in range(max(1, side.total_pixels // (SEGMENT_WIDTH + 5))):
+            layout.segments.append(
+                SegmentDefinition(
+                    f"{side.name}_{order}",
+                    side.name,
+                    min(SEGMENT_WIDTH, side.total_pixels),
+                    "even",
+                    order,
+                )
+            )
+    return layout
+
+
+def write_config(path: str, size: int):
+    table = table_for(size)
+    layout = layout_for(table)
+    data = {
+        "strip": {"count": size},
+        "tables": {
+            table.name: {
+                "width": table.width_meters,
+                "length": table.length_meters,
+                "ppm": table.pixels_per_meter,
+                "sides": [
+                    {"name": s.name, "length": s.length_meters, "order": s.order}
+                    for s in table.sides
+                ],
+            }
+        },
+        "layouts": {
+            layout.name: {
+                "table": table.name,
+                "segments": [
+                    {
+                        "name": s.name,
+                        "side": s.side_name,
+                        "width": s.width_pixels,
+                        "strategy": s.strategy,
+                        "order": s.order_index,
+                    }
+                    for s in layout.segments
+                ],
+            }
+        },
+        "key_bindings": {},
+        "active_table": table.name,
+        "active_layout": layout.name,
+    }
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def bench_patterns(results, repeat):
+    patterns = {
+        "Solid": (Solid(0xFF0000, duration_frames=255), 1),
+        "Fade": (Fade(0x00FF00, duration_frames=255), 1),
+        "Blink": (BlinkPattern(0x0000FF), 10),
+        "Rainbow": (RainbowPattern(duration_frames=255), 1),
+    }
+    for name, (pattern, loops) in patterns.items():
+        results[f"pattern.{name}.generate"] = measure(
+            lambda _: pattern.generate(0x101010, loops), repeat=repeat
+        )
+
+
+def bench_size(results, size, repeat):
+    colors = np.random.default_rng(size).integers(0, 2**32, size, dtype=np.uint32)
+    starts = colors.tolist()
+
+    def interpolate(_):
+        for i, start in enumerate(starts):
+            interpolate_color(start, 0x00FFFFFF, i % 30, 30)
+
+    results[f"interpolate_color[{size}]"] = measure(interpolate, repeat=repeat)
+
+    strip = HeadlessStrip(size)
+
+    def fresh_segment():
+        SEQUENCES.clear()
+        segment = StripSegment(0, size - 1, strip=strip)
+        return segment
+
+    for anim_class in ANIMATIONS:
+        anim = anim_class()
+        results[f"animation.{anim_class.__name__}.apply[{size}]"] = measure(
+            lambda segment: segment.apply(anim), setup=fresh_segment, repeat=repeat
+        )
+
+    out = FrameOutput(strip, size)
+    for anim_class in (Rainbow, Chase):
+        anim = anim_class()
+
+        def running_segment():
+            segment = fresh_segment()
+            segment.apply(anim)
+            return segment
+
+        def animate(segment):
+            for _ in range(FRAMES_PER_SAMPLE):
+                segment.animate(1, out)
+
+        results[f"segment.animate.{anim_class.__name__}[{size}]"] = measure(
+            animate, setup=running_segment, repeat=repeat, per=FRAMES_PER_SAMPLE
+        )
+
+    def layered_segment():
+        # A pulse blended over an ambient rainbow
+        segment = fresh_segment()
+        segment.apply(Rainbow())
+        segment.set_layer("pulse", "add", 0.5)
+        segment.apply(Blink(duration=3), layer="pulse")
+        return segment
+
+    results[f"segment.animate.layered[{size}]"] = measure(
+        animate, setup=layered_segment, repeat=repeat, per=FRAMES_PER_SAMPLE
+    )
+
+    table = table_for(size)
+    layout = layout_for(table)
+    results[f"layout.calculate_segments[{size}]"] = measure(
+        lambda _: layout.calculate_segments(table), repeat=repeat
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "config.json")
+        write_config(path, size)
+        original = controller_module.PixelStrip
+        controller_module.PixelStrip = HeadlessStrip
+        try:
+            with quiet():
+                controller = controller_module.Controller(path)
+        finally:
+            controller_module.PixelStrip = original
+
+    names = list(controller.segments)
+
+    def busy_controller():
+        # Every segment runs one of the animations, all at once
+        with quiet():
+            controller.clear_segment("ALL")
+            for i, name in enumerate(names):
+                anim = ANIMATIONS[i % len(ANIMATIONS)].__name__
+                controller.apply_animation(name, anim)
+            # Apply the queued commands outside the timed frames
+            controller.commands.drain()
+        return controller
+
+    def frames(c):
+        for _ in range(FRAMES_PER_SAMPLE):
+            c.render(1)
+            c.show()
+
+    results[f"controller.frame[{size}]"] = measure(
+        frames, setup=busy_controller, repeat=repeat, number=3, per=FRAMES_PER_SAMPLE
+    )
+
+
+def run(sizes, repeat) -> dict:
+    results = {}
+    bench_patterns(results, repeat)
+    for size in sizes:
+        print(f"Benchmarking {size} LEDs...", file=sys.stderr)
+        bench_size(results, size, repeat)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "sizes": sizes,
+        },
+        "results": {
+            name: {
+                "median_us": median * 1e6,
+                "min_us": best * 1e6,
+                "reference_us": ref * 1e6,
+            }
+            for name, (median, best, ref) in results.items()
+        },
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print a comparison table and return the names that regressed.
+
+    Best-of-N times are compared, each scaled by the reference workload timed
+    next to it, since raw times drift with machine load and clock speed.
+    """
+    regressions = []
+    base = baseline.get("results", {})
+    print(f"{'benchmark':<42}{'best us':>12}{'baseline':>12}{'ratio':>8}")
+    for name, result in current["results"].items():
+        best = result["min_us"]
+        if name not in base:
+            print(f"{name:<42}{best:>12.1f}{'new':>12}")
+            continue
+        speed = base[name]["reference_us"] / result["reference_us"]
+        ratio = best * speed / base[name]["min_us"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  <-- REGRESSION"
+        print(f"{name:<42}{best:>12.1f}{base[name]['min_us']:>12.1f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", default=",".join(map(str, SIZES)), help="Comma separated LED counts"
+    )
+    parser.add_argument("--repeat", type=int, default=7, help="Samples per benchmark")
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--output", help="Also write results to this JSON file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.0,
+        help="Allowed slowdown before failing (1.0 = twice as slow)",
+    )
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="Record results as baseline"
+    )
+    args = parser.parse_args()
+
+    current = run([int(s) for s in args.sizes.split(",")], args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(json.dumps(current, indent=2))
+        print(f"No baseline at {args.baseline}; run with --update-baseline")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        print(
+            f"\nPERFORMANCE REGRESSION: {len(regressions)} benchmark(s) more than "
+            f"{args.tolerance:.0%} slower than baseline:",
+            file=sys.stderr,
+        )
+        for name in regressions:
+            print(f"  {name}", file=sys.stderr)
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
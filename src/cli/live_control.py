@@ -1,7 +1,7 @@
 
 import time
 from dataclasses import dataclass, field
-from typing import List
+from typing import List, Optional
 
 from InquirerPy import inquirer
 from InquirerPy.base.control import Choice
@@ -9,6 +9,8 @@ from InquirerPy.validator import NumberValidator
 
 from led.config import ConfigManager
 from led.controller import ANIMATION_MAP, COLOR_MAP, Controller
+from led.server import ControlServer
+from led.stats import format_report
 
 
 @dataclass
@@ -31,6 +33,7 @@ class LiveControlWizard:
         self.cm = ConfigManager(config_path)
         self.controller: Controller
         self.pending_actions: List[Action] = []
+        self.server: Optional[ControlServer] = None
 
     def setup_controller(self) -> bool:
         # 1. Select Table/Layout if needed
@@ -66,7 +69,7 @@ class LiveControlWizard:
 
         # Initialize Controller
         print(f"Initializing controller with {t_name} / {l_name}...")
-        self.controller = Controller(self.config_path)
+        self.controller = Controller(self.config_path, self.cm)
         return True
 
     def run(self):
@@ -76,6 +79,19 @@ class LiveControlWizard:
         # Start animation loop in background
         self.controller.start_animation_thread()
 
+        # Game software can drive the lights alongside the menu
+        server = self.controller.config_manager.get_server_settings()
+        if server["socket"] or server["port"]:
+            self.server = ControlServer(
+                self.controller, server["socket"], server["host"], server["port"]
+            )
+            try:
+                self.server.start_thread()
+                print(f"Command server listening on {self.server.address}")
+            except (OSError, RuntimeError) as e:
+                print(f"Could not start the command server: {e}")
+                self.server = None
+
         print("Controller running. Enter menu to queue commands.")
 
         try:
@@ -87,6 +103,15 @@ class LiveControlWizard:
                     Choice("Execute", f"Execute Pending ({len(self.pending_actions)})"),
                     Choice("Clear Pending", "Clear Pending Actions"),
                     Choice("Reset Strip", "Reset/Clear Strip"),
+                    Choice(
+                        "Switch Layout",
+                        f"Switch Layout ({self.controller.active_layout})",
+                    ),
+                    Choice(
+                        "Brightness",
+                        f"Set Brightness ({self.controller.LED_BRIGHTNESS})",
+                    ),
+                    Choice("Stats", "Show Frame Stats"),
                     Choice("Exit", "Exit"),
                 ]
 
@@ -107,15 +132,21 @@ class LiveControlWizard:
                     case "Reset Strip":
                         self.controller.clear_segment("ALL")
                         print("Strip cleared.")
+                    case "Switch Layout":
+                        self.switch_layout()
+                    case "Brightness":
+                        self.set_brightness()
+                    case "Stats":
+                        print(format_report(self.controller.get_stats()))
                     case "Exit":
-                        self.controller.running = False
+                        self.controller.stop()
                         break
 
         except KeyboardInterrupt:
-            self.controller.running = False
+            self.controller.stop()
         except Exception as e:
             print(f"Error: {e}")
-            self.controller.running = False
+            self.controller.stop()
         finally:
             # wait a bit for thread to clean up if needed
             time.sleep(0.5)
@@ -195,36 +226,56 @@ class LiveControlWizard:
         )
         print(f"Queued: Color {color_name} on {target}")
 
+    def switch_layout(self):
+        layout = inquirer.select(
+            message="Layout:",
+            choices=list(self.controller.layouts),
+            default=self.controller.active_layout,
+        ).execute()
+        self.controller.switch_layout(layout)
+
+    def set_brightness(self):
+        level = inquirer.number(
+            message="Brightness (0-255):",
+            min_allowed=0,
+            max_allowed=255,
+            default=self.controller.LED_BRIGHTNESS,
+            validate=NumberValidator(),
+        ).execute()
+        self.controller.set_brightness(int(level))
+
     def execute_pending(self):
         if not self.pending_actions:
             print("Nothing to execute.")
             return
 
         print(f"Executing {len(self.pending_actions)} actions...")
-        for action in self.pending_actions:
-            if action.type == "animation":
-                # Reuse the controller's apply_animation logic
-                # We might need to handle "ALL"
-                if action.target == "ALL":
-                    for seg_name in self.controller.segments:
+        # Everything pending starts on the same frame
+        with self.controller.batch():
+            for action in self.pending_actions:
+                if action.type == "animation":
+                    # Reuse the controller's apply_animation logic
+                    # We might need to handle "ALL"
+                    if action.target == "ALL":
+                        for seg_name in self.controller.segments:
+                            self.controller.apply_animation(
+                                seg_name, action.details["animation"]
+                            )
+                    else:
                         self.controller.apply_animation(
-                            seg_name, action.details["animation"]
+                            action.target, action.details["animation"]
+                        )
+
+                elif action.type == "color":
+                    color_val = action.details["color_val"]
+                    if action.details["mode"] == "segment":
+                        # Use Solid animation which is now available
+                        self.controller.apply_animation(
+                            action.target, "Solid", {"color": color_val}
+                        )
+                    elif action.details["mode"] == "range":
+                        self.controller.set_color_range(
+                            action.details["start"], action.details["end"], color_val
                         )
-                else:
-                    self.controller.apply_animation(
-                        action.target, action.details["animation"]
-                    )
-
-            elif action.type == "color":
-                color_val = action.details["color_val"]
-                if action.details["mode"] == "segment":
-                    # Use Solid animation which is now available
-                    self.controller.apply_animation(
-                        action.target, "Solid", {"color": color_val}
-                    )
-                elif action.details["mode"] == "range":
-                    self.controller.set_color_range(
-                        action.details["start"], action.details["end"], color_val
-                    )
 
         self.pending_actions.clear()
@@ -1,11 +1,17 @@
 import argparse
+import json
+import sys
+import time
 
 from InquirerPy import inquirer
 
 from cli import setup
 from cli.live_control import LiveControlWizard
 from led import config
+from led.client import ControlClient
 from led.controller import Controller
+from led.server import ControlServer
+from led.stats import format_report
 from led.strip import StripSegment
 from led.table import TablePosition
 
@@ -93,6 +99,99 @@ def setup_mode():
             case "Exit":
                 break
 
+def stats_mode(args):
+    """Report frame stats of the running show, or of a headless run."""
+    if args.headless:
+        snapshot = headless_stats(args)
+    else:
+        snapshot = server_stats(args)
+    if snapshot is None:
+        return
+    if args.json:
+        print(json.dumps(snapshot, indent=2))
+    else:
+        print(format_report(snapshot))
+
+
+def server_stats(args):
+    """Ask the running show's command server for its frame stats."""
+    address = server_address(args, config.ConfigManager(args.config))
+    if address["path"] is None and address["port"] is None:
+        print("No server address: pass --socket or --port, or set config 'server'.")
+        print("Use --headless to measure without a running show.")
+        return None
+    try:
+        with ControlClient(**address) as client:
+            reply = client.request({"cmd": "stats"})
+    except OSError as e:
+        print(f"Could not reach the show: {e}")
+        print("Use --headless to measure without a running show.")
+        return None
+    if not reply.get("ok"):
+        print(f"Stats failed: {reply.get('error')}")
+        return None
+    return reply["result"]
+
+
+def headless_stats(args):
+    """Run the active layout headless for a while and return its frame stats."""
+    controller = Controller(args.config)
+    for name in controller.segments:
+        controller.apply_animation(name, args.animation)
+
+    thread = controller.start_animation_thread()
+    time.sleep(args.seconds)
+    controller.stop()
+    thread.join()
+    return controller.get_stats()
+
+
+def server_address(args, cm: config.ConfigManager) -> dict:
+    """Socket path or TCP address from the command line, else the config."""
+    settings = cm.get_server_settings()
+    if args.socket or args.port:
+        return {"path": args.socket, "host": args.host, "port": args.port}
+    return {
+        "path": settings["socket"],
+        "host": settings["host"],
+        "port": settings["port"],
+    }
+
+
+def serve_mode(args):
+    """Run the active layout headless, driven only by the command server."""
+    controller = Controller(args.config)
+    address = server_address(args, controller.config_manager)
+    if address["path"] is None and address["port"] is None:
+        print("No server address: pass --socket or --port, or set config 'server'.")
+        return
+    server = ControlServer(controller, **address)
+    try:
+        server.start_thread()
+    except (OSError, RuntimeError) as e:
+        print(f"Could not start the command server: {e}")
+        return
+    print(f"Listening on {server.address}. Ctrl-C to stop.")
+    try:
+        controller.animation_loop()
+    except KeyboardInterrupt:
+        controller.stop()
+    server.stop()
+
+
+def send_mode(args):
+    """Send JSON commands to a running server and print the replies."""
+    address = server_address(args, config.ConfigManager(args.config))
+    lines = args.commands or [line for line in sys.stdin if line.strip()]
+    commands = [json.loads(line) for line in lines]
+    with ControlClient(**address) as client:
+        # Pipelined: everything is sent before the first reply is read
+        for command in commands:
+            client.send(command)
+        for _ in commands:
+            print(json.dumps(client.receive()))
+
+
 def main():
     parser = argparse.ArgumentParser(description="Game Lights Controller")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
@@ -106,6 +205,39 @@ def main():
     # Run command
     _ = subparsers.add_parser("run", help="Run the light show")
 
+    # Stats command
+    stats_parser = subparsers.add_parser(
+        "stats", help="Frame timing of the show running 'serve' or 'run'"
+    )
+    stats_parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Run the active layout here instead of asking a running show",
+    )
+    stats_parser.add_argument(
+        "--seconds", type=float, default=10, help="With --headless: how long to run"
+    )
+    stats_parser.add_argument(
+        "--animation",
+        default="Rainbow",
+        help="With --headless: animation to run on every segment",
+    )
+    stats_parser.add_argument("--json", action="store_true", help="Print JSON")
+
+    # Command server and client
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run the show, controlled over a socket"
+    )
+    send_parser = subparsers.add_parser("send", help="Send commands to 'serve'")
+    send_parser.add_argument(
+        "commands", nargs="*", help="JSON commands (default: one per line on stdin)"
+    )
+    for sub in (serve_parser, send_parser, stats_parser):
+        sub.add_argument("--config", default="config.json")
+        sub.add_argument("--socket", help="Unix socket path")
+        sub.add_argument("--host", default="127.0.0.1")
+        sub.add_argument("--port", type=int, help="TCP port")
+
     args = parser.parse_args()
 
     match args.command:
@@ -116,6 +248,12 @@ def main():
         case "run":
             wizard = LiveControlWizard("config.json")
             wizard.run()
+        case "stats":
+            stats_mode(args)
+        case "serve":
+            serve_mode(args)
+        case "send":
+            send_mode(args)
         case _:
             parser.print_help()
 
@@ -1,12 +1,16 @@
 import math
 from dataclasses import dataclass, field
-from typing import List
+from typing import List, Optional
 
+import numpy as np
+
+from .clock import SHOW_CLOCK
+from .framebuffer import FrameBuffer
 from .patterns import Blink as BlinkPattern
-from .patterns import Fade, Pattern, Solid
+from .patterns import Fade, Pattern
 from .patterns import Rainbow as RainbowPattern
 from .pixel import Colors, Pixel
-from .strip import StripSegment
+from .strip import SegmentPixels, StripSegment
 
 try:
     from rpi_ws281x import Color
@@ -16,12 +20,44 @@ except ImportError:
         return (r << 16) | (g << 8) | b | (w << 24)
 
 
+def _columns(pixels: List[Pixel]):
+    """Group pixels by the buffer they live in.
+
+    Yields each buffer with the columns of its pixels and their positions in
+    ``pixels``, so an animation can queue one shared sequence on all of them at
+    once.
+    """
+    if isinstance(pixels, SegmentPixels):
+        # A whole segment: every column of its buffer, in order
+        cols = np.arange(len(pixels))
+        yield pixels.segment.buffer, cols, cols
+        return
+    groups: dict[int, tuple] = {}
+    for i, pixel in enumerate(pixels):
+        buffer, cols, positions = groups.setdefault(
+            id(pixel.buffer), (pixel.buffer, [], [])
+        )
+        cols.append(pixel.col)
+        positions.append(i)
+    for buffer, cols, positions in groups.values():
+        yield buffer, np.array(cols), np.array(positions)
+
+
 @dataclass
 class Animation:
     """Base class for Strip Animations."""
 
     def apply(self, pixels: List[Pixel]):
         """Apply the animation to the given pixels."""
+        for buffer, cols, positions in _columns(pixels):
+            self.queue(buffer, cols, positions, len(pixels))
+
+    def queue(self, buffer: FrameBuffer, cols, positions, n: int):
+        """Queue the animation on ``cols`` of ``buffer``.
+
+        ``positions`` are the places of those columns along the ``n`` pixels
+        being animated, for animations that move across them.
+        """
         pass
 
 
@@ -31,40 +67,43 @@ class Chase(Animation):
     direction: int = 1  # 1 for forward, -1 for backward
     tail_length: int = 5
     speed_delay: int = 2  # Frames between steps
-
-    def apply(self, pixels: List[Pixel]):
-        n = len(pixels)
-        for i, pixel in enumerate(pixels):
-            # Calculate start delay based on position
-            if self.direction == 1:
-                delay = i * self.speed_delay
-            else:
-                delay = (n - 1 - i) * self.speed_delay
-
-            # Initial delay
-            if delay > 0:
-                pixel.add_pattern(Solid(0, duration_frames=delay))
-
-            # The "Head" (fade in quickly)
-            pixel.add_pattern(Fade(self.color, duration_frames=2))
-
-            # The "Tail" (fade out)
-            pixel.add_pattern(
-                Fade(0, duration_frames=self.tail_length * self.speed_delay)
-            )
+    speed_ms: Optional[float] = None  # Milliseconds between steps, if set
+
+    def queue(self, buffer: FrameBuffer, cols, positions, n: int):
+        # Calculate start delay based on position
+        steps = positions if self.direction == 1 else n - 1 - positions
+        if self.speed_ms is None:
+            delays = steps * self.speed_delay
+            tail = Fade(0, duration_frames=self.tail_length * self.speed_delay)
+        else:
+            delays = SHOW_CLOCK.to_frames(steps * self.speed_ms)
+            tail = Fade(0, duration_ms=self.tail_length * self.speed_ms)
+
+        # Every pixel runs the same head and tail, shifted by its delay
+        buffer.add_phased(
+            cols,
+            [
+                # The "Head" (fade in quickly)
+                Fade(self.color, duration_frames=2),
+                # The "Tail" (fade out)
+                tail,
+            ],
+            delays,
+            lead=0,
+        )
 
 
 @dataclass
 class FadeInOut(Animation):
     color: int = Colors.BLUE
     duration: int = 30  # Frames for full fade in
+    duration_ms: Optional[float] = None
 
-    def apply(self, pixels: List[Pixel]):
-        for pixel in pixels:
-            # Fade In
-            pixel.add_pattern(Fade(self.color, duration_frames=self.duration))
-            # Fade Out
-            pixel.add_pattern(Fade(0, duration_frames=self.duration))
+    def queue(self, buffer: FrameBuffer, cols, positions, n: int):
+        # Fade In
+        buffer.add_pattern(cols, Fade(self.color, self.duration, self.duration_ms))
+        # Fade Out
+        buffer.add_pattern(cols, Fade(0, self.duration, self.duration_ms))
 
 
 @dataclass
@@ -78,57 +117,62 @@ class Flare(Animation):
     color2: int = Colors.YELLOW
     speed_delay: int = 2
     transition_duration: int = 10
-
-    def apply(self, pixels: List[Pixel]):
-        n = len(pixels)
-        center = n // 2
-
-        for i, pixel in enumerate(pixels):
-            dist = abs(i - center)
-            delay = dist * self.speed_delay
-
-            # Start with Color 1 (assuming currently 0 or we set it)
-            # If we assume the strip is already Color 1, we just wait then fade.
-            # If not, we set it to Color 1 first.
-            pixel.add_pattern(
-                Solid(self.color1, duration_frames=1)
-            )  # Set initial state
-
-            if delay > 0:
-                pixel.add_pattern(Solid(self.color1, duration_frames=delay))
-
-            # Transition to Color 2
-            pixel.add_pattern(
-                Fade(self.color2, duration_frames=self.transition_duration)
-            )
+    speed_ms: Optional[float] = None
+    transition_ms: Optional[float] = None
+
+    def queue(self, buffer: FrameBuffer, cols, positions, n: int):
+        steps = np.abs(positions - n // 2)
+        if self.speed_ms is None:
+            delays = steps * self.speed_delay
+        else:
+            delays = SHOW_CLOCK.to_frames(steps * self.speed_ms)
+
+        # Hold Color 1 for one frame plus the delay, then transition to
+        # Color 2 from there.
+        buffer.add_phased(
+            cols,
+            [Fade(self.color2, self.transition_duration, self.transition_ms)],
+            delays + 1,
+            lead=self.color1,
+        )
 
 
 @dataclass
 class Blink(Animation):
     color: int = Colors.GREEN
     duration: int = 10
+    duration_ms: Optional[float] = None
 
-    def apply(self, pixels: List[Pixel]):
-        for pixel in pixels:
-            pixel.add_pattern(
-                BlinkPattern(
-                    self.color, off_duration=self.duration, on_duration=self.duration
-                )
-            )
+    def queue(self, buffer: FrameBuffer, cols, positions, n: int):
+        buffer.add_pattern(
+            cols,
+            BlinkPattern(
+                self.color,
+                off_duration=self.duration,
+                on_duration=self.duration,
+                on_ms=self.duration_ms,
+                off_ms=self.duration_ms,
+            ),
+        )
 
 
 @dataclass
 class Rainbow(Animation):
-    speed: int = 10
+    """Rainbow spread along the pixels and cycling through time.
 
-    def apply(self, pixels: List[Pixel]):
-        # Apply Rainbow pattern to all.
-        # Can optionally shift phase for a "moving" rainbow if RainbowPattern supported it.
-        # Current RainbowPattern is a cycle over time.
-        # To make it a "Rainbow transition across the entire strip", we might want
-        # pixels to be out of phase.
-
-        # Updating RainbowPattern in patterns.py to support phase would be better,
-        # but for now we apply the temporal rainbow.
-        for pixel in pixels:
-            pixel.add_pattern(RainbowPattern(duration_frames=255))
+    Pixel ``i`` shows hue ``(i * spread + t) mod 256`` at frame ``t``.
+    ``spread`` is in hue steps per pixel; the default fits one whole wheel
+    across the pixels, and 0 gives every pixel the same color.
+    """
+
+    speed: int = 10
+    spread: Optional[float] = None
+    cycle_ms: Optional[float] = None  # Time for one trip around the wheel
+
+    def queue(self, buffer: FrameBuffer, cols, positions, n: int):
+        pattern = RainbowPattern(duration_frames=255, duration_ms=self.cycle_ms)
+        spread = 256 / max(n, 1) if self.spread is None else self.spread
+        # Hue steps to frames of the pattern's cycle
+        cycle = pattern.cycle_frames
+        shifts = np.round(positions * spread * cycle / 256).astype(np.int64) % cycle
+        buffer.add_pattern(cols, pattern, shifts=shifts if spread else None)
@@ -0,0 +1,78 @@
+"""Shared, memoized pattern sequences"""
+
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from typing import Optional
+
+import numpy as np
+
+from .patterns import Pattern
+
+
+class SequenceCache:
+    """LRU cache of generated pattern sequences.
+
+    Sequences are keyed on the pattern type, its parameters, the start color and
+    the loop count, and handed out as read-only arrays. Every pixel that runs the
+    same pattern from the same color shares one copy.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, np.ndarray] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(pattern: Pattern, start_color: int, num_loops: int) -> Optional[tuple]:
+        if not is_dataclass(pattern):
+            return None
+        params = tuple(getattr(pattern, f.name) for f in fields(pattern))
+        # Time based durations depend on the frame rate, so key on frames too
+        key = (type(pattern), params, pattern.cycle_frames, start_color, num_loops)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, pattern: Pattern, start_color: int, num_loops: int = 1) -> np.ndarray:
+        """Return the steps of ``pattern``, generating them on a miss."""
+        key = self.key(pattern, start_color, num_loops)
+        if key is not None and key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        steps = np.fromiter(
+            pattern.iter_colors(start_color, num_loops),
+            dtype=np.uint32,
+            count=pattern.frame_count(num_loops),
+        )
+        steps.flags.writeable = False
+        if key is not None:
+            self._entries[key] = steps
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return steps
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Shared by every FrameBuffer
+SEQUENCES = SequenceCache()
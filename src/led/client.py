@@ -0,0 +1,54 @@
+"""Blocking client for the JSON command server"""
+
+import json
+import socket
+from typing import Any, Optional
+
+
+class ControlClient:
+    """Talks to a ControlServer over its Unix socket or TCP port.
+
+    ``request`` sends one command (or a list, applied as a batch) and waits
+    for the reply. To pipeline, ``send`` several and ``receive`` the replies
+    afterwards; they arrive in the order the commands were sent.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+        timeout: Optional[float] = 5.0,
+    ):
+        if path is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port), timeout)
+            # Commands are tiny; send them now rather than waiting to coalesce
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self.sock.makefile("rb")
+
+    def send(self, command: Any):
+        self.sock.sendall(json.dumps(command).encode() + b"\n")
+
+    def receive(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection")
+        return json.loads(line)
+
+    def request(self, command: Any) -> Any:
+        self.send(command)
+        return self.receive()
+
+    def close(self):
+        self._reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,35 @@
+"""Conversion between show time and frames"""
+
+from typing import Optional
+
+import numpy as np
+
+
+class ShowClock:
+    """The frame rate the show runs at, for time based durations.
+
+    Frames advance with monotonic time: the FrameScheduler reports every
+    frame that elapsed, and late frames are skipped rather than played late.
+    A duration given in milliseconds becomes a frame count at this rate, so
+    a half second fade takes half a second at any fps.
+    """
+
+    def __init__(self, fps: float = 20.0):
+        self.fps = fps
+
+    def to_frames(self, ms):
+        """Frames in ``ms`` milliseconds, rounded; works on arrays too."""
+        frames = np.round(np.asarray(ms, dtype=np.float64) * self.fps / 1000)
+        if frames.ndim:
+            return frames.astype(np.int64)
+        return int(frames)
+
+    def duration(self, frames: int, ms: Optional[float] = None) -> int:
+        """A pattern duration: ``ms`` if given (at least one frame), else ``frames``."""
+        if ms is None:
+            return frames
+        return max(1, self.to_frames(ms))
+
+
+# The clock the controller's animation loop runs on
+SHOW_CLOCK = ShowClock()
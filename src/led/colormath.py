@@ -0,0 +1,51 @@
+"""Fixed-point math on packed 0xWWRRGGBB colors"""
+
+import numpy as np
+
+# Weights are fractions of ONE: 0 is the first color, ONE the second
+WEIGHT_BITS = 8
+ONE = 1 << WEIGHT_BITS
+
+# Two channels are blended at once: red and blue, then white and green.
+# Each 8-bit channel times a weight of at most ONE fits in its 16-bit lane.
+_LANES = 0x00FF00FF
+_HALF = 0x00800080  # Rounds each lane to nearest instead of down
+
+
+def weights(steps, total_steps: int) -> np.ndarray:
+    """Weights for ``steps`` out of ``total_steps``, rounded to nearest."""
+    steps = np.asarray(steps, dtype=np.int64)
+    if total_steps <= 0:
+        return np.full(steps.shape, ONE, dtype=np.uint32)
+    w = (steps * ONE + total_steps // 2) // total_steps
+    return np.clip(w, 0, ONE).astype(np.uint32)
+
+
+def lerp(start, end, weight) -> np.ndarray:
+    """Blend colors ``start`` toward ``end`` by ``weight``.
+
+    All three broadcast against each other, so one call covers many steps of
+    many pixels: e.g. starts of shape (pixels, 1) with weights of shape
+    (steps,) give every pixel's whole fade as a (pixels, steps) array. The
+    math is integer only, two multiplies per color per lane pair.
+    """
+    start = np.asarray(start, dtype=np.uint32)
+    end = np.asarray(end, dtype=np.uint32)
+    w = np.asarray(weight, dtype=np.uint32)
+    inv = ONE - w
+    rb = (start & _LANES) * inv + (end & _LANES) * w + _HALF
+    wg = ((start >> 8) & _LANES) * inv + ((end >> 8) & _LANES) * w + _HALF
+    return ((rb >> WEIGHT_BITS) & _LANES) | (wg & (_LANES << WEIGHT_BITS))
+
+
+def lerp_color(start: int, end: int, weight: int) -> int:
+    """Scalar ``lerp`` on plain ints, for one-off colors."""
+    inv = ONE - weight
+    rb = (start & _LANES) * inv + (end & _LANES) * weight + _HALF
+    wg = ((start >> 8) & _LANES) * inv + ((end >> 8) & _LANES) * weight + _HALF
+    return ((rb >> WEIGHT_BITS) & _LANES) | (wg & (_LANES << WEIGHT_BITS))
+
+
+def crossfade(start, end, opacity: float) -> np.ndarray:
+    """``end`` laid over ``start`` at ``opacity`` (0.0 to 1.0)."""
+    return lerp(start, end, round(min(max(opacity, 0.0), 1.0) * ONE))
@@ -0,0 +1,37 @@
+"""Hand-off of work from input threads to the animation thread"""
+
+from collections import deque
+from typing import Callable
+
+Command = Callable[[], None]
+
+
+class CommandQueue:
+    """Batches of commands waiting for the next frame boundary.
+
+    Input threads ``put`` batches and the animation thread ``drain``s them
+    before it renders a frame. Commands therefore never run while a frame is
+    being rendered, and everything in one batch takes effect on the same
+    frame. ``deque.append`` and ``popleft`` are atomic, so no lock is needed.
+    """
+
+    def __init__(self):
+        self._batches: deque[list[Command]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._batches)
+
+    def put(self, batch: list[Command]):
+        self._batches.append(batch)
+
+    def drain(self) -> int:
+        """Run every pending batch, in order. Returns how many commands ran."""
+        count = 0
+        while self._batches:
+            for command in self._batches.popleft():
+                try:
+                    command()
+                except Exception as e:
+                    print(f"Command failed: {e}")
+                count += 1
+        return count
@@ -0,0 +1,229 @@
+"""Patterns built from other patterns, evaluated on demand"""
+
+from abc import abstractmethod
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import numpy as np
+
+from .clock import SHOW_CLOCK
+from .compositor import BLEND_MODES, blend as blend_colors
+from .patterns import Pattern
+
+# Frames in a loop that never ends (about 1,700 years at 20 fps)
+FOREVER = 1 << 40
+
+
+class _Node(Pattern):
+    """A pattern made of other patterns.
+
+    A node describes one pass in ``_pass``. Further loops of the node start
+    from the color the first pass ended on, like a Fade that holds its target
+    after the first loop. Nothing is generated ahead of time, so a node costs
+    the size of its tree whatever the number of frames it covers.
+    """
+
+    _memo: dict
+
+    @abstractmethod
+    def _pass(self, frames: np.ndarray, current_color: int) -> np.ndarray:
+        """Colors at ``frames`` within the first pass."""
+        pass
+
+    def _remember(self, key, compute):
+        """Per node memo of values that only depend on ``key``."""
+        if key not in self._memo:
+            if len(self._memo) >= 64:
+                self._memo.clear()
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def colors_at(self, frames: np.ndarray, current_color: int) -> np.ndarray:
+        frames = np.asarray(frames)
+        cycle = self.cycle_frames
+        if not cycle:
+            return np.full(frames.shape, current_color, dtype=np.uint32)
+        passes, frames = np.divmod(frames, cycle)
+        first = passes == 0
+        if first.all():
+            return self._pass(frames, current_color)
+        again = self._remember(
+            ("end", current_color, cycle),
+            lambda: int(self._pass(np.array([cycle - 1]), current_color)[0]),
+        )
+        if not first.any():
+            return self._pass(frames, again)
+        out = np.empty(frames.shape, dtype=np.uint32)
+        out[first] = self._pass(frames[first], current_color)
+        out[~first] = self._pass(frames[~first], again)
+        return out
+
+
+@dataclass(init=False)
+class Sequence(_Node):
+    """Patterns played one after another, each from the color the last ended on."""
+
+    patterns: tuple
+
+    def __init__(self, *patterns: Pattern):
+        self.patterns = patterns
+        self._memo = {}
+
+    @property
+    def cycle_frames(self) -> int:
+        return sum(pattern.cycle_frames for pattern in self.patterns)
+
+    @property
+    def uses_current_color(self) -> bool:
+        return any(pattern.uses_current_color for pattern in self.patterns)
+
+    def frozen(self) -> "Sequence":
+        return Sequence(*(pattern.frozen() for pattern in self.patterns))
+
+    def _parts(self, current_color: int) -> list[tuple]:
+        """Each non-empty pattern with its first frame, length and start color."""
+        lengths = tuple(pattern.cycle_frames for pattern in self.patterns)
+        return self._remember(
+            ("parts", current_color, lengths),
+            lambda: self._chain(current_color, lengths),
+        )
+
+    def _chain(self, current_color: int, lengths: tuple) -> list[tuple]:
+        parts = []
+        begin, color = 0, current_color
+        for pattern, length in zip(self.patterns, lengths):
+            if not length:
+                continue
+            parts.append((pattern, begin, length, color))
+            begin += length
+            color = pattern.color_at(length - 1, color)
+        return parts
+
+    def _pass(self, frames: np.ndarray, current_color: int) -> np.ndarray:
+        parts = self._parts(current_color)
+        if len(frames):
+            # Usually every pixel is in the same part
+            lo, hi = int(frames.min()), int(frames.max())
+            for pattern, begin, length, color in parts:
+                if begin <= lo and hi < begin + length:
+                    return pattern.colors_at(frames - begin, color)
+        out = np.empty(frames.shape, dtype=np.uint32)
+        for pattern, begin, length, color in parts:
+            hit = (frames >= begin) & (frames < begin + length)
+            if hit.any():
+                out[hit] = pattern.colors_at(frames[hit] - begin, color)
+        return out
+
+    def runs(self, current_color: int, num_loops: int = 1):
+        colors, lengths = [], []
+        for pattern, _, _, color in self._parts(current_color):
+            runs = pattern.runs(color)
+            if runs is None:
+                return None
+            colors.append(runs[0])
+            lengths.append(runs[1])
+        if not colors:
+            return None
+        colors, lengths = np.concatenate(colors), np.concatenate(lengths)
+        if num_loops > 1:
+            # Later loops start from the first one's last color
+            again = self.runs(int(colors[-1]))
+            colors = np.concatenate([colors, np.tile(again[0], num_loops - 1)])
+            lengths = np.concatenate([lengths, np.tile(again[1], num_loops - 1)])
+        return colors, lengths
+
+
+@dataclass
+class Loop(Pattern):
+    """A pattern repeated ``count`` times, or forever when ``count`` is None.
+
+    Repeats follow the pattern's own loop rules and are never copied out, so
+    a loop that runs forever takes no more memory than one pass. (Use
+    ``iter_colors`` rather than ``generate`` to look at one.)
+    """
+
+    pattern: Pattern
+    count: Optional[int] = None
+
+    @property
+    def cycle_frames(self) -> int:
+        if self.count is None:
+            return FOREVER
+        return self.pattern.cycle_frames * self.count
+
+    @property
+    def uses_current_color(self) -> bool:
+        return self.pattern.uses_current_color
+
+    def frozen(self) -> "Loop":
+        return replace(self, pattern=self.pattern.frozen())
+
+    def colors_at(self, frames: np.ndarray, current_color: int) -> np.ndarray:
+        return self.pattern.colors_at(frames, current_color)
+
+    def runs(self, current_color: int, num_loops: int = 1):
+        if self.count is None:
+            return None
+        return self.pattern.runs(current_color, self.count * num_loops)
+
+
+@dataclass
+class Delay(Pattern):
+    """Holds whatever color is showing."""
+
+    duration_frames: int = 1
+    duration_ms: Optional[float] = None
+
+    @property
+    def cycle_frames(self) -> int:
+        return SHOW_CLOCK.duration(self.duration_frames, self.duration_ms)
+
+    def colors_at(self, frames: np.ndarray, current_color: int) -> np.ndarray:
+        return np.full(np.shape(frames), current_color, dtype=np.uint32)
+
+    def runs(self, current_color: int, num_loops: int = 1):
+        return (
+            np.array([current_color], dtype=np.uint32),
+            np.array([self.frame_count(num_loops)], dtype=np.int64),
+        )
+
+
+@dataclass(init=False)
+class Parallel(_Node):
+    """Patterns played at the same time, blended bottom to top.
+
+    All of them start from the current color; one that finishes early holds
+    its last color until the longest is done.
+    """
+
+    patterns: tuple
+    blend: str = "max"
+
+    def __init__(self, *patterns: Pattern, blend: str = "max"):
+        if blend not in BLEND_MODES:
+            raise ValueError(f"Unknown blend mode: {blend}")
+        self.patterns = patterns
+        self.blend = blend
+        self._memo = {}
+
+    @property
+    def cycle_frames(self) -> int:
+        return max((pattern.cycle_frames for pattern in self.patterns), default=0)
+
+    @property
+    def uses_current_color(self) -> bool:
+        return any(pattern.uses_current_color for pattern in self.patterns)
+
+    def frozen(self) -> "Parallel":
+        patterns = (pattern.frozen() for pattern in self.patterns)
+        return Parallel(*patterns, blend=self.blend)
+
+    def _pass(self, frames: np.ndarray, current_color: int) -> np.ndarray:
+        out = None
+        for pattern in self.patterns:
+            length = pattern.cycle_frames
+            if not length:
+                continue
+            colors = pattern.colors_at(np.minimum(frames, length - 1), current_color)
+            out = colors if out is None else blend_colors(out, colors, self.blend)
+        return out
@@ -0,0 +1,84 @@
+"""Blending of animation layers on top of a segment"""
+
+import math
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .colormath import crossfade
+from .framebuffer import FrameBuffer
+
+# replace: the layer wins outright, whatever its opacity
+# alpha: the layer is mixed over what is below by its opacity
+# add / multiply / max: per channel, then mixed by the layer's opacity
+BLEND_MODES = ("replace", "alpha", "add", "multiply", "max")
+
+
+def clamp_opacity(value) -> float:
+    """``value`` as an opacity from 0 to 1. Raises ValueError if not a number."""
+    opacity = float(value)
+    if math.isnan(opacity):
+        raise ValueError(f"Bad opacity: {value!r}")
+    return min(max(opacity, 0.0), 1.0)
+
+
+def _channels(colors: np.ndarray) -> np.ndarray:
+    """View packed colors as (pixels x 4) channel bytes, in memory order."""
+    return np.ascontiguousarray(colors, dtype=np.uint32).view(np.uint8).reshape(-1, 4)
+
+
+def blend(base: np.ndarray, top: np.ndarray, mode: str, opacity: float = 1.0):
+    """Blend ``top`` onto ``base``, both arrays of packed colors.
+
+    Every channel is treated the same way, so the byte order of the packing
+    does not matter.
+    """
+    if mode == "replace":
+        return np.array(top, dtype=np.uint32)
+    if mode == "alpha":
+        return crossfade(base, top, opacity)
+
+    b = _channels(base).astype(np.uint32)
+    t = _channels(top).astype(np.uint32)
+    match mode:
+        case "add":
+            mixed = np.minimum(b + t, 255)
+        case "multiply":
+            mixed = (b * t + 127) // 255
+        case "max":
+            mixed = np.maximum(b, t)
+        case _:
+            raise ValueError(f"Unknown blend mode: {mode}")
+    mixed = mixed.astype(np.uint8).view(np.uint32).ravel()
+    return crossfade(base, mixed, opacity)
+
+
+@dataclass
+class Layer:
+    """An animation running on top of a segment.
+
+    A layer only covers the pixels it is animating; when its animation ends
+    those pixels show whatever is below again.
+    """
+
+    buffer: FrameBuffer = field(repr=False)
+    blend: str = "replace"
+    opacity: float = 1.0
+
+    def __post_init__(self):
+        if self.blend not in BLEND_MODES:
+            raise ValueError(f"Unknown blend mode: {self.blend}")
+        self.opacity = clamp_opacity(self.opacity)
+
+
+def composite(base: np.ndarray, layers) -> np.ndarray:
+    """Combine ``base`` colors with each layer in order, bottom to top."""
+    frame = base.copy()
+    for layer in layers:
+        covered = layer.buffer.active
+        if not covered.any():
+            continue
+        frame[covered] = blend(
+            frame[covered], layer.buffer.current[covered], layer.blend, layer.opacity
+        )
+    return frame
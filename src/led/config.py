@@ -1,6 +1,7 @@
+import hashlib
 import json
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from .models import CalculatedSegment, Layout, SegmentDefinition, Table, TableSide
 from .strip import StripSegment
@@ -8,28 +9,132 @@ from .table import TablePosition
 
 CONFIG_FILE = "config.json"
 
+STRIP_DEFAULTS = {
+    "count": 300,  # Number of LED pixels.
+    "pin": 18,  # GPIO pin connected to the pixels (18 uses PWM!).
+    "freq_hz": 800000,  # LED signal frequency in hertz (usually 800khz)
+    "dma": 10,  # DMA channel to use for generating signal (try 10)
+    "brightness": 255,  # Set to 0 for darkest and 255 for brightest
+    "gamma": 1.0,  # Gamma correction, one value or [r, g, b, w]; ~2.5 suits WS281x
+    "invert": False,  # True to invert the signal (when using NPN transistor level shift)
+    "channel": 0,  # set to '1' for GPIOs 13, 19, 41, 45 or 53
+}
+
+RENDER_DEFAULTS = {
+    "fps": 20,  # Target frame rate of the animation loop
+    "max_frame_skip": 5,  # Frames to skip at most when a frame overruns
+    "pipelined": False,  # Push frames on a separate output thread
+    "config_poll": 1.0,  # Seconds between checks for config file edits, 0 = off
+}
+
+SERVER_DEFAULTS = {
+    "socket": None,  # Unix socket path for the command server
+    "host": "127.0.0.1",  # TCP host, used when "port" is set
+    "port": None,  # TCP port for the command server
+}
+
+
+def _digest(raw: Optional[bytes]) -> Optional[str]:
+    return hashlib.sha1(raw).hexdigest() if raw is not None else None
+
 
 class ConfigManager:
+    """The config file, parsed.
+
+    Tables, layouts and the calculated segments are built once and cached
+    until the file changes on disk (by mtime and size, confirmed by a hash of
+    its contents) or is saved; ``reload`` picks up edits made elsewhere.
+    Cached objects are shared between callers, so treat them as read-only.
+    """
+
     def __init__(self, filename: str = CONFIG_FILE):
         self.filename = filename
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._digest: Optional[str] = None
+        self._cache: Dict[Any, Any] = {}
         self.data = self._load_raw()
 
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read(self) -> Optional[bytes]:
+        try:
+            with open(self.filename, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
     def _load_raw(self) -> Dict[str, Any]:
-        if not os.path.exists(self.filename):
+        stamp = self._stat()
+        raw = self._read()
+        self._loaded(raw, stamp)
+        if raw is None:
             return {}
         try:
-            with open(self.filename, "r") as f:
-                return json.load(f)
+            return json.loads(raw)
         except json.JSONDecodeError:
             return {}
 
+    def _loaded(self, raw: Optional[bytes], stamp: Optional[Tuple[int, int]]):
+        """Remember which version of the file the data came from."""
+        self._stamp = stamp
+        self._digest = _digest(raw)
+        self._cache.clear()
+
+    def reload(self) -> bool:
+        """Re-read the file if it changed on disk. Returns whether it did.
+
+        A file that does not parse (e.g. caught halfway through being saved)
+        is skipped and the current data kept.
+        """
+        stamp = self._stat()
+        if stamp == self._stamp or stamp is None:
+            return False
+        raw = self._read()
+        if _digest(raw) == self._digest:
+            # Touched but not edited
+            self._stamp = stamp
+            return False
+        try:
+            data = json.loads(raw)
+        except (TypeError, json.JSONDecodeError) as e:
+            print(f"Config not reloaded: {e}")
+            self._stamp = stamp
+            return False
+        self._loaded(raw, stamp)
+        self.data = data
+        return True
+
+    def _cached(self, key, build: Callable[[], Any]):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
     def save(self):
-        with open(self.filename, "w") as f:
-            json.dump(self.data, f, indent=4)
+        raw = json.dumps(self.data, indent=4).encode()
+        with open(self.filename, "wb") as f:
+            f.write(raw)
+        self._loaded(raw, self._stat())
         print(f"Configuration saved to {self.filename}")
 
+    def get_strip_settings(self) -> Dict[str, Any]:
+        return {**STRIP_DEFAULTS, **self.data.get("strip", {})}
+
+    def get_render_settings(self) -> Dict[str, Any]:
+        return {**RENDER_DEFAULTS, **self.data.get("render", {})}
+
+    def get_server_settings(self) -> Dict[str, Any]:
+        return {**SERVER_DEFAULTS, **self.data.get("server", {})}
+
     # --- Table Management ---
     def get_tables(self) -> Dict[str, Table]:
+        return self._cached("tables", self._build_tables)
+
+    def _build_tables(self) -> Dict[str, Table]:
         tables = {}
         raw_tables = self.data.get("tables", {})
         for name, data in raw_tables.items():
@@ -71,6 +176,11 @@ class ConfigManager:
 
     # --- Layout Management ---
     def get_layout(self, layout_name: str) -> Optional[Layout]:
+        return self._cached(
+            ("layout", layout_name), lambda: self._build_layout(layout_name)
+        )
+
+    def _build_layout(self, layout_name: str) -> Optional[Layout]:
         raw_layouts = self.data.get("layouts", {})
         if layout_name not in raw_layouts:
             return None
@@ -119,7 +229,25 @@ class ConfigManager:
         self.data["active_layout"] = layout_name
         self.save()
 
+    def get_layout_configurations(self) -> Dict[str, List[CalculatedSegment]]:
+        """Calculated segments of every layout, each on its own table."""
+        return self._cached("layouts", self._build_layout_configurations)
+
+    def _build_layout_configurations(self) -> Dict[str, List[CalculatedSegment]]:
+        tables = self.get_tables()
+        configurations = {}
+        for l_name, l_data in self.data.get("layouts", {}).items():
+            layout = self.get_layout(l_name)
+            if layout and l_data["table"] in tables:
+                configurations[l_name] = layout.calculate_segments(
+                    tables[l_data["table"]]
+                )
+        return configurations
+
     def get_active_configuration(self) -> Optional[List[CalculatedSegment]]:
+        return self._cached("active", self._build_active_configuration)
+
+    def _build_active_configuration(self) -> Optional[List[CalculatedSegment]]:
         t_name = self.data.get("active_table")
         l_name = self.data.get("active_layout")
 
@@ -134,6 +262,8 @@ class ConfigManager:
         if not layout:
             return None
 
+        if layout.table_name == t_name:
+            return self.get_layout_configurations()[l_name]
         return layout.calculate_segments(tables[t_name])
 
 
@@ -1,11 +1,18 @@
 import json
+import os
 import select
 import sys
+import termios
 import threading
 import time
+import tty
+from contextlib import contextmanager
 from dataclasses import dataclass, field
+from functools import partial
 from typing import Dict, List, Optional
 
+import numpy as np
+
 # Handle hardware dependency for local dev
 try:
     from rpi_ws281x import Color, PixelStrip
@@ -24,6 +31,7 @@ except ImportError:
             channel=0,
         ):
             self.num = num
+            self._led_data = [0] * num
 
         def begin(self):
             pass
@@ -32,21 +40,38 @@ except ImportError:
             pass
 
         def setPixelColor(self, n, color):
-            pass
+            # Like the real driver, writes past the end are ignored
+            if 0 <= n < self.num:
+                self._led_data[n] = color
 
         def getPixelColorRGBW(self, n):
-            return (0, 0, 0, 0)
+            c = self._led_data[n]
+            return ((c >> 16) & 0xFF, (c >> 8) & 0xFF, c & 0xFF, (c >> 24) & 0xFF)
+
+        def numPixels(self):
+            return self.num
 
     def Color(r, g, b, w=0):
         return (w << 24) | (r << 16) | (g << 8) | b
 
 
 from .animations import Animation, Blink, Chase, FadeInOut, Flare, Rainbow
+from .cache import SEQUENCES
+from .clock import SHOW_CLOCK
+from .commands import Command, CommandQueue
+from .compositor import BLEND_MODES, clamp_opacity
+from .correction import ColorCorrection
 from .config import ConfigManager
+from .layout_index import LayoutIndex
 from .patterns import Solid
-from .pixel import Colors, Pixel
+from .output import FrameOutput
+from .pipeline import OutputPipeline
+from .pixel import Colors
+from .scheduler import FrameScheduler
+from .stats import FrameStats
 from .strip import StripSegment
 from .table import TablePosition
+from .watcher import ConfigWatcher
 
 # Map string names to classes/enums
 ANIMATION_MAP = {
@@ -58,6 +83,12 @@ ANIMATION_MAP = {
     "Solid": Solid,
 }
 
+# Layout name for segments from the legacy "layout" list
+LEGACY_LAYOUT = "legacy"
+
+# Names used in key_bindings for keys that are not printable
+KEY_NAMES = {" ": "space", "\r": "enter", "\n": "enter", "\t": "tab", "\x1b": "escape"}
+
 COLOR_MAP = {
     "RED": Colors.RED,
     "ORANGE": Colors.ORANGE,
@@ -79,22 +110,25 @@ COLOR_MAP = {
 
 
 class Controller:
-    def __init__(self, config_path: str):
-        self.config_manager = ConfigManager(config_path)
+    def __init__(
+        self, config_path: str, config_manager: Optional[ConfigManager] = None
+    ):
+        self.config_manager = config_manager or ConfigManager(config_path)
         self.config = (
             self.config_manager.data
         )  # Direct access for legacy keys like key_bindings
 
-        # LED Strip Configuration (Defaults, could be in config)
-        self.LED_COUNT = 300  # Number of LED pixels.
-        self.LED_PIN = 18  # GPIO pin connected to the pixels (18 uses PWM!).
-        self.LED_FREQ_HZ = 800000  # LED signal frequency in hertz (usually 800khz)
-        self.LED_DMA = 10  # DMA channel to use for generating signal (try 10)
-        self.LED_BRIGHTNESS = 255  # Set to 0 for darkest and 255 for brightest
-        self.LED_INVERT = (
-            False  # True to invert the signal (when using NPN transistor level shift)
-        )
-        self.LED_CHANNEL = 0  # set to '1' for GPIOs 13, 19, 41, 45 or 53
+        # LED Strip Configuration (the "strip" section of the config)
+        strip = self.config_manager.get_strip_settings()
+        self._strip_settings = strip
+        self.LED_COUNT = strip["count"]
+        self.LED_PIN = strip["pin"]
+        self.LED_FREQ_HZ = strip["freq_hz"]
+        self.LED_DMA = strip["dma"]
+        self.LED_BRIGHTNESS = strip["brightness"]
+        self.LED_GAMMA = strip["gamma"]
+        self.LED_INVERT = strip["invert"]
+        self.LED_CHANNEL = strip["channel"]
 
         self.strip = PixelStrip(
             self.LED_COUNT,
@@ -102,48 +136,83 @@ class Controller:
             self.LED_FREQ_HZ,
             self.LED_DMA,
             self.LED_INVERT,
-            self.LED_BRIGHTNESS,
+            255,  # Brightness is applied by the output stage, see set_brightness
             self.LED_CHANNEL,
         )
         self.strip.begin()
+        self.output = FrameOutput(
+            self.strip,
+            self.LED_COUNT,
+            ColorCorrection(self.LED_GAMMA, self.LED_BRIGHTNESS),
+        )
+
+        render = self.config_manager.get_render_settings()
+        self._render_settings = render
+        self.scheduler = FrameScheduler(render["fps"], render["max_frame_skip"])
+        # Time based animation durations are converted at this frame rate
+        SHOW_CLOCK.fps = render["fps"]
+        self.stats = FrameStats()
+        self.pipeline: Optional[OutputPipeline] = None
+        if render["pipelined"]:
+            self.pipeline = OutputPipeline(self.output, on_show=self.stats.record_show)
+        # Wakes the animation thread when it is idle and new work arrives
+        self._wake = threading.Event()
+        self._wake_requested: Optional[float] = None
+        # Work for the animation thread, applied between frames
+        self.commands = CommandQueue()
+        self._local = threading.local()  # Open batch of the submitting thread
+        self._key_pressed: Optional[float] = None  # Oldest key not yet shown
+        # Pipe written to by stop() so a blocked input loop returns; only open
+        # while the input loop runs
+        self._input_stop_r: Optional[int] = None
+        self._input_stop_w: Optional[int] = None
+        self._input_stop_lock = threading.Lock()
+        # Edits to the config file are applied while the show runs
+        self.watcher: Optional[ConfigWatcher] = None
+        if render["config_poll"]:
+            self.watcher = ConfigWatcher(
+                self.config_manager, self.reload_config, render["config_poll"]
+            )
 
         self.segments: Dict[str, StripSegment] = {}
-        self.queues: Dict[
-            str, List[Animation]
-        ] = {}  # Target -> List of queued animations
+        # Target -> List of queued animations; like the segments, only changed
+        # by commands run on the animation thread
+        self.queues: Dict[str, List[Animation]] = {}
+        # Segments of every layout in the config, by layout name
+        self.layouts: Dict[str, Dict[str, StripSegment]] = {}
+        self.layout_indexes: Dict[str, LayoutIndex] = {}
+        self.active_layout: Optional[str] = None
+        self._segment_pool: Dict[tuple, StripSegment] = {}
         self.running = True
 
         self._setup_segments()
 
     def _setup_segments(self):
         """Initialize segments from config."""
+        layouts, self._configured_layout = self._layout_specs()
+        self._load_layouts(layouts, self._configured_layout)
+
+    def _layout_specs(self) -> tuple[Dict[str, Dict[str, tuple]], Optional[str]]:
+        """Segments of every layout in the config, and the layout to show.
+
+        Each layout maps segment names to (start LED, end LED, TablePosition).
+        """
+        configurations = self.config_manager.get_layout_configurations()
+        layouts = {name: self._specs(calc) for name, calc in configurations.items()}
 
         # Try new rich config first
         calculated_segments = self.config_manager.get_active_configuration()
 
         if calculated_segments:
             print(f"Loading {len(calculated_segments)} segments from active layout.")
-            for calc_seg in calculated_segments:
-                # Map arbitrary side name to a TablePosition if possible (for backward compat) or custom
-                try:
-                    table_pos = TablePosition[calc_seg.side_name.upper()]
-                except KeyError:
-                    table_pos = TablePosition.NO_SEAT
-
-                segment = StripSegment(calc_seg.start_led, calc_seg.end_led, table_pos)
-
-                # Initialize Pixels
-                for i in range(calc_seg.start_led, calc_seg.end_led + 1):
-                    p = Pixel(self.strip, i)
-                    segment.pixels.append(p)
-
-                self.segments[calc_seg.name] = segment
-                self.queues[calc_seg.name] = []
-            return
+            active = self.config["active_layout"]
+            layouts[active] = self._specs(calculated_segments)
+            return layouts, active
 
         # Fallback to legacy layout list
         if "layout" in self.config:
             print("Loading segments from legacy layout list.")
+            specs = {}
             for item in self.config["layout"]:
                 pos_name = item["position"]
                 start = item["start"]
@@ -155,14 +224,139 @@ class Controller:
                     print(f"Unknown TablePosition: {pos_name}")
                     continue
 
-                segment = StripSegment(start, end, table_pos)
-
-                for i in range(start, end + 1):
-                    p = Pixel(self.strip, i)
-                    segment.pixels.append(p)
+                specs[pos_name] = (start, end, table_pos)
+            layouts[LEGACY_LAYOUT] = specs
+            return layouts, LEGACY_LAYOUT
+        return layouts, None
+
+    @staticmethod
+    def _specs(calculated_segments) -> Dict[str, tuple]:
+        specs = {}
+        for calc_seg in calculated_segments:
+            # Map arbitrary side name to a TablePosition if possible (for backward compat) or custom
+            try:
+                table_pos = TablePosition[calc_seg.side_name.upper()]
+            except KeyError:
+                table_pos = TablePosition.NO_SEAT
+
+            specs[calc_seg.name] = (calc_seg.start_led, calc_seg.end_led, table_pos)
+        return specs
+
+    def _load_layouts(
+        self, layouts: Dict[str, Dict[str, tuple]], active: Optional[str]
+    ):
+        """Build the segments of every layout up front, then show ``active``.
+
+        A segment with the same name and placement in several layouts is one
+        object, so it keeps running across a switch. Objects from before a
+        reload are reused the same way.
+        """
+        known = self._segment_pool
+        self._segment_pool = {}
+        self.layouts = {}
+        self.layout_indexes = {}
+        for layout, specs in layouts.items():
+            segments = {}
+            for name, spec in specs.items():
+                key = (name, *spec)
+                segment = self._segment_pool.get(key) or known.get(key)
+                if segment is None:
+                    # Pixels are created by the segment on top of its frame buffer
+                    segment = StripSegment(*spec, self.strip)
+                self._segment_pool[key] = segments[name] = segment
+            self.layouts[layout] = segments
+            self.layout_indexes[layout] = LayoutIndex(
+                {name: (seg.begin_led, seg.end_led) for name, seg in segments.items()},
+                self.LED_COUNT,
+            )
+            for first, second in self.layout_indexes[layout].overlaps:
+                print(f"Warning: Segments {first} and {second} overlap in {layout}.")
+        if active is None:
+            self._show_layout({}, LayoutIndex({}, self.LED_COUNT))
+        else:
+            self._show_layout(self.layouts[active], self.layout_indexes[active])
+        self.active_layout = active
+
+    def _show_layout(self, segments: Dict[str, StripSegment], index: LayoutIndex):
+        """Make ``segments`` the ones rendered, turning off any that go away."""
+        queues: Dict[str, List[Animation]] = {}
+        for name, segment in segments.items():
+            kept = self.segments.get(name) is segment
+            queues[name] = self.queues.get(name, []) if kept else []
+        for name, old in self.segments.items():
+            if segments.get(name) is not old:
+                old.clear(self.output)
+        self.index = index
+        self.segments = segments
+        self.queues = queues
+
+    def switch_layout(self, layout: str) -> bool:
+        """Show another layout from the config, starting on the next frame.
+
+        Every layout is built when the config is loaded, so this only swaps
+        which segments are rendered; the choice is not saved to the config.
+        """
+        if layout not in self.layouts:
+            print(f"Unknown layout: {layout}")
+            return False
+        self.submit(partial(self._switch_layout, layout))
+        return True
 
-                self.segments[pos_name] = segment
-                self.queues[pos_name] = []
+    def _switch_layout(self, layout: str):
+        self._show_layout(self.layouts[layout], self.layout_indexes[layout])
+        self.active_layout = layout
+
+    def reload_config(self):
+        """Apply the config file, as last loaded, to the running show.
+
+        Key bindings take effect at once; brightness, gamma, frame rate and
+        segment changes are applied together between frames. Segments whose
+        placement did not change keep their animations. Settings of the strip
+        hardware itself need a restart.
+        """
+        print("Config file changed, reloading.")
+        self.config = self.config_manager.data
+        strip = self.config_manager.get_strip_settings()
+        render = self.config_manager.get_render_settings()
+        restart = [
+            key
+            for key in ("count", "pin", "freq_hz", "dma", "invert", "channel")
+            if strip[key] != self._strip_settings[key]
+        ]
+        if render["pipelined"] != self._render_settings["pipelined"]:
+            restart.append("pipelined")
+        if restart:
+            print(f"Restart to apply: {', '.join(restart)}")
+
+        with self.batch():
+            if (strip["gamma"], strip["brightness"]) != (
+                self._strip_settings["gamma"],
+                self._strip_settings["brightness"],
+            ):
+                self.LED_GAMMA = strip["gamma"]
+                self.LED_BRIGHTNESS = strip["brightness"]
+                correction = ColorCorrection(self.LED_GAMMA, self.LED_BRIGHTNESS)
+                self.submit(partial(self.output.set_correction, correction))
+            if (render["fps"], render["max_frame_skip"]) != (
+                self._render_settings["fps"],
+                self._render_settings["max_frame_skip"],
+            ):
+                self.submit(
+                    partial(self._set_rate, render["fps"], render["max_frame_skip"])
+                )
+            layouts, configured = self._layout_specs()
+            active = configured
+            if configured == self._configured_layout and self.active_layout in layouts:
+                # switch_layout's choice stays unless the file picks another layout
+                active = self.active_layout
+            self._configured_layout = configured
+            self.submit(partial(self._load_layouts, layouts, active))
+        self._strip_settings = strip
+        self._render_settings = render
+
+    def _set_rate(self, fps: float, max_skip: int):
+        self.scheduler.set_rate(fps, max_skip)
+        SHOW_CLOCK.fps = fps
 
     def _parse_params(self, params: dict):
         """Convert string color names to int values in params."""
@@ -177,42 +371,43 @@ class Controller:
                 parsed[k] = v
         return parsed
 
-    def handle_command(self, key: str):
-        """Execute command based on key binding."""
-        if key not in self.config["key_bindings"]:
-            return
+    def handle_command(self, key: str) -> bool:
+        """Execute command based on key binding. Returns False for unbound keys."""
+        if key not in self.config.get("key_bindings", {}):
+            return False
 
-        cmd = self.config["key_bindings"][key]
+        pressed = time.perf_counter()
+        with self.batch():
+            self.run_action(self.config["key_bindings"][key])
+            # Rides along with the key's commands to time the frame that shows them
+            self.submit(partial(self._mark_key, pressed))
+        return True
+
+    def _mark_key(self, pressed: float):
+        if self._key_pressed is None:
+            self._key_pressed = pressed
+
+    def run_action(self, cmd: dict):
+        """Execute a key binding style action, e.g. {"action": "trigger", ...}."""
         action = cmd.get("action")
         target_name = cmd.get("target")
 
         match action:
             case "quit":
-                self.running = False
+                self.stop()
 
             case "clear":
-                match target_name:
-                    case "ALL":
-                        for seg in self.segments.values():
-                            seg.clear()
-                    case _ if target_name in self.segments:
-                        self.segments[target_name].clear()
+                self.clear_segment(target_name)
+
+            case "switch_layout":
+                self.switch_layout(cmd.get("layout"))
 
             case "trigger_all":
-                # Trigger the next queued item for all segments
-                for name, queue in self.queues.items():
-                    if queue:
-                        anim = queue.pop(0)
-                        if name in self.segments:
-                            print(f"Triggering {type(anim).__name__} on {name}")
-                            anim.apply(self.segments[name].pixels)
+                # Trigger the next queued item for all segments, on one frame
+                self.submit(self._trigger_all)
 
             case "trigger":
-                if target_name in self.queues and self.queues[target_name]:
-                    anim = self.queues[target_name].pop(0)
-                    if target_name in self.segments:
-                        print(f"Triggering {type(anim).__name__} on {target_name}")
-                        anim.apply(self.segments[target_name].pixels)
+                self.submit(partial(self._trigger, target_name))
 
             case "queue" | "immediate" as act:
                 anim_name = cmd.get("animation")
@@ -229,42 +424,214 @@ class Controller:
                     case "immediate":
                         if target_name in self.segments:
                             print(f"Applying {anim_name} immediately to {target_name}")
-                            animation.apply(self.segments[target_name].pixels)
+                            self.submit(
+                                partial(self.segments[target_name].apply, animation)
+                            )
 
                     case "queue":
-                        if target_name in self.queues:
-                            print(f"Queueing {anim_name} for {target_name}")
-                            self.queues[target_name].append(animation)
+                        self.submit(partial(self._queue, target_name, animation))
+
+    def _queue(self, name: str, animation: Animation):
+        if name in self.queues:
+            print(f"Queueing {type(animation).__name__} for {name}")
+            self.queues[name].append(animation)
+
+    def _trigger(self, name: str):
+        if self.queues.get(name):
+            anim = self.queues[name].pop(0)
+            print(f"Triggering {type(anim).__name__} on {name}")
+            self.segments[name].apply(anim)
+
+    def _trigger_all(self):
+        for name in self.queues:
+            self._trigger(name)
 
     def input_loop(self):
-        """Listen for keyboard input."""
+        """Listen for keyboard input.
+
+        On a terminal every keystroke is handled as soon as it is typed;
+        otherwise (e.g. piped input) each line is one key. Either way the
+        thread blocks in select() until there is input or stop() is called.
+        """
         print("Starting Input Loop. Press keys defined in config. 'q' to quit.")
-        # Simple non-blocking input for demo/dev (requires 'enter' in standard terminal)
-        # For true single-keystroke in terminal, we'd need tty/termios magic
-        # But this suffices for 'commands'
+        self._input_stop_r, self._input_stop_w = os.pipe()
+        try:
+            self._read_input(sys.stdin.fileno())
+        finally:
+            with self._input_stop_lock:
+                os.close(self._input_stop_r)
+                os.close(self._input_stop_w)
+                self._input_stop_r = self._input_stop_w = None
+
+    def _read_input(self, fd: int):
+        if not os.isatty(fd):
+            # os.read, not sys.stdin, so no lines sit unseen in Python's buffer
+            pending = b""
+            while self._wait_for_input(fd):
+                data = os.read(fd, 4096)
+                if not data:
+                    break
+                *lines, pending = (pending + data).split(b"\n")
+                for line in lines:
+                    self.handle_command(line.decode(errors="ignore").strip())
+            if pending and self.running:
+                self.handle_command(pending.decode(errors="ignore").strip())
+            return
 
-        while self.running:
-            # Check for input without blocking indefinitely
-            if sys.stdin in select.select([sys.stdin], [], [], 0)[0]:
-                line = sys.stdin.readline()
-                if line:
-                    key = line.strip()
-                    self.handle_command(key)
-            time.sleep(0.1)
+        saved = termios.tcgetattr(fd)
+        # cbreak rather than raw, so Ctrl-C still interrupts
+        tty.setcbreak(fd)
+        try:
+            while self._wait_for_input(fd):
+                data = os.read(fd, 64)
+                if not data:
+                    break
+                for char in data.decode(errors="ignore"):
+                    self.handle_command(KEY_NAMES.get(char, char))
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+    def _wait_for_input(self, fd: int) -> bool:
+        """Block until ``fd`` is readable. Returns False once stopped."""
+        if not self.running:
+            return False
+        ready, _, _ = select.select([fd, self._input_stop_r], [], [])
+        return self.running and fd in ready
+
+    def submit(self, command: Command):
+        """Run ``command`` on the animation thread before the next frame.
+
+        Inside ``batch()`` the command is held back and goes out with the rest
+        of the batch.
+        """
+        batch = getattr(self._local, "batch", None)
+        if batch is not None:
+            batch.append(command)
+            return
+        self.commands.put([command])
+        self.wake()
+
+    @contextmanager
+    def batch(self):
+        """Group the commands submitted in this block so they start on one frame."""
+        if getattr(self._local, "batch", None) is not None:
+            yield
+            return
+        self._local.batch = batch = []
+        try:
+            yield
+        finally:
+            self._local.batch = None
+            if batch:
+                self.commands.put(batch)
+                self.wake()
+
+    def wake(self):
+        """Tell the animation thread there is work, waking it if it is idle."""
+        if self._wake_requested is None:
+            self._wake_requested = time.perf_counter()
+        self._wake.set()
+
+    def stop(self):
+        """Stop the animation and input loops."""
+        self.running = False
+        self.wake()
+        with self._input_stop_lock:
+            if self._input_stop_w is not None:
+                os.write(self._input_stop_w, b"x")
+
+    def _is_idle(self) -> bool:
+        return (
+            not self.commands
+            and not any(segment.busy for segment in self.segments.values())
+        )
 
     def animation_loop(self):
-        """Main loop to update LEDs."""
+        """Main loop to update LEDs.
+
+        When nothing is animating the thread blocks until wake() is called,
+        instead of polling at the frame rate.
+        """
         print("Starting Animation Loop.")
+        if self.pipeline is not None:
+            self.pipeline.start()
+        if self.watcher is not None:
+            self.watcher.start()
+        self.scheduler.start()
+        frames = 1
+        frame_start = time.perf_counter()
         while self.running:
-            # Update all segments
-            for segment in self.segments.values():
-                segment.animate()
-
-            # Push updates to physical strip
-            self.strip.show()
+            # Clear before checking, so a wake() that races the check is kept
+            self._wake.clear()
+            if self._is_idle():
+                self._wake.wait()
+                if self._wake_requested is not None:
+                    self.stats.record_wake(time.perf_counter() - self._wake_requested)
+                self._wake_requested = None
+                self.scheduler.start()
+                frames = 1
+                frame_start = time.perf_counter()
+                continue
+            self._wake_requested = None
+
+            # Update all segments, skipping ahead if the last frame ran late
+            self.render(frames)
+            rendered = time.perf_counter()
+
+            # Push the frame to the physical strip, unless it is unchanged.
+            # When pipelined, the output thread pushes it while we move on.
+            if self.pipeline is not None:
+                sent = self.pipeline.submit()
+            else:
+                sent = self.show()
+            if not sent:
+                self.stats.idle_frames += 1
+            shown = time.perf_counter()
+            if self._key_pressed is not None:
+                self.stats.record_key(shown - self._key_pressed)
+                self._key_pressed = None
+
+            # Sleep until the next frame deadline
+            frames = self.scheduler.wait()
+            frame_end = time.perf_counter()
+            self.stats.record_frame(
+                render=rendered - frame_start,
+                show=None if self.pipeline is not None else shown - rendered,
+                sleep=frame_end - shown,
+                jitter=frame_end - frame_start - self.scheduler.period * frames,
+            )
+            frame_start = frame_end
+
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.pipeline is not None:
+            self.pipeline.stop()
+
+    def render(self, frames: int = 1):
+        """Apply pending commands, then advance every segment into the output frame.
+
+        This is the only place segments are changed while the loop runs, so
+        commands never land halfway through a frame.
+        """
+        self.commands.drain()
+        for name, segment in self.segments.items():
+            segment.animate(frames, self.output)
+            self.stats.record_active(name, segment.active_count)
+
+    def show(self) -> bool:
+        """Push the output frame and latch it, if anything changed."""
+        if not self.output.push():
+            return False
+        self.strip.show()
+        return True
 
-            # Control framerate (e.g., 50ms = 20fps)
-            time.sleep(0.05)
+    def get_stats(self) -> dict:
+        """Snapshot of frame timing, scheduler and cache statistics."""
+        return {
+            **self.stats.snapshot(),
+            "scheduler": self.scheduler.stats(),
+            "sequence_cache": SEQUENCES.stats(),
+        }
 
     def start_animation_thread(self):
         """Start the animation loop in a separate daemon thread."""
@@ -272,8 +639,14 @@ class Controller:
         t.start()
         return t
 
-    def apply_animation(self, target_name: str, anim_name: str, params: dict = None):
-        """Apply an animation immediately to a target."""
+    def apply_animation(
+        self,
+        target_name: str,
+        anim_name: str,
+        params: dict = None,
+        layer: Optional[str] = None,
+    ):
+        """Apply an animation immediately to a target, or to one of its layers."""
         if params is None:
             params = {}
 
@@ -291,34 +664,67 @@ class Controller:
         animation = anim_class(**parsed_params)
 
         print(f"Applying {anim_name} immediately to {target_name}")
-        animation.apply(self.segments[target_name].pixels)
+        self.submit(partial(self.segments[target_name].apply, animation, layer))
+        return True
+
+    def set_layer(
+        self,
+        target_name: str,
+        layer: str,
+        blend: Optional[str] = None,
+        opacity: Optional[float] = None,
+    ):
+        """Create a layer on a segment, or change its blend mode or opacity."""
+        if target_name not in self.segments:
+            print(f"Unknown segment: {target_name}")
+            return False
+
+        if blend is not None and blend not in BLEND_MODES:
+            print(f"Unknown blend mode: {blend}")
+            return False
+
+        if opacity is not None:
+            try:
+                opacity = clamp_opacity(opacity)
+            except (TypeError, ValueError):
+                print(f"Bad opacity: {opacity!r}")
+                return False
+
+        segment = self.segments[target_name]
+        self.submit(partial(segment.set_layer, layer, blend, opacity))
         return True
 
-    def clear_segment(self, target_name: str):
+    def set_brightness(self, brightness: int):
+        """Dim or brighten the whole strip, from 0 (off) to 255."""
+        self.LED_BRIGHTNESS = min(max(int(brightness), 0), 255)
+        self.submit(partial(self.output.set_brightness, self.LED_BRIGHTNESS))
+
+    def clear_segment(self, target_name: str, layer: Optional[str] = None):
         if target_name == "ALL":
             for seg in self.segments.values():
-                seg.clear()
+                self.submit(partial(seg.clear, self.output, layer))
         elif target_name in self.segments:
-            self.segments[target_name].clear()
+            self.submit(partial(self.segments[target_name].clear, self.output, layer))
 
     def set_color_range(self, start: int, end: int, color_val: int):
-        """Set a range of raw pixels to a color."""
-        # This is a raw operation, might override segment animations temporarily
-        # until next frame if animations are active.
-        # But if no animation is active on those pixels, it sticks.
-        # Actually, segment.animate() might overwrite this if an animation is running.
-        # So we should probably find which segment owns these pixels and apply a Solid pattern?
-        # Or just write to strip and hope no animation overwrites it.
-        # Given the architecture, it's safer to apply a Solid pattern to the relevant pixels
-        # if we want it to persist.
-        # But for "Select available pixels as a range", it implies bypassing segments?
-        # Let's just write to the strip for now, assuming the user knows what they are doing.
-        # However, the animation loop calls strip.show() every frame.
-        # If we just setPixelColor, it will be shown on next frame.
-        # BUT if a segment overlaps and has an animation, it will overwrite.
-        for i in range(start, end + 1):
-            if 0 <= i < self.LED_COUNT:
-                self.strip.setPixelColor(i, color_val)
+        """Set a range of raw pixels to a color.
+
+        Pixels inside a segment stop what they are running and hold the color,
+        so an animation does not paint over it on the next frame.
+        """
+        self.submit(partial(self._fill, start, end, color_val))
+
+    def _fill(self, start: int, end: int, color_val: int):
+        owned, loose = self.index.split(start, end)
+        for name, leds in owned.items():
+            segment = self.segments[name]
+            segment.fill(leds - segment.begin_led, color_val, self.output)
+        if len(loose):
+            self.output.write(loose, np.full(len(loose), color_val, dtype=np.uint32))
+
+    def segment_at(self, led: int) -> Optional[str]:
+        """Name of the segment showing LED ``led``, if any."""
+        return self.index.segment_at(led)
 
     def run(self):
         # Start input listener in separate thread so animation doesn't block
@@ -329,12 +735,16 @@ class Controller:
         try:
             self.animation_loop()
         except KeyboardInterrupt:
-            self.running = False
+            self.stop()
+        # Let the input thread put the terminal back the way it was
+        input_thread.join(1)
 
         print("Exiting...")
-        # Cleanup
+        # Cleanup; the animation thread is done, so segments can be touched here
+        self.commands.drain()
         for seg in self.segments.values():
-            seg.clear()
+            seg.clear(self.output)
+        self.output.push()
         self.strip.show()
 
 
@@ -0,0 +1,58 @@
+"""Gamma and brightness correction applied on the way to the strip"""
+
+import sys
+from typing import Sequence, Union
+
+import numpy as np
+
+# Byte offset of each channel (r, g, b, w) inside a packed 0xWWRRGGBB color
+_OFFSETS = [2, 1, 0, 3] if sys.byteorder == "little" else [1, 2, 3, 0]
+
+
+def build_lut(gamma: float, brightness: int) -> np.ndarray:
+    """256-entry table mapping a channel value to its corrected output."""
+    levels = np.arange(256) / 255.0
+    scale = min(max(brightness, 0), 255)
+    return np.round(levels**gamma * scale).astype(np.uint8)
+
+
+class ColorCorrection:
+    """Per-channel lookup tables for gamma and global brightness.
+
+    Patterns work in linear, full-brightness colors; the output stage maps the
+    whole frame through these tables just before it goes to the strip. Changing
+    the brightness only rebuilds four 256-entry tables, so queued animations
+    are never regenerated.
+    """
+
+    def __init__(
+        self, gamma: Union[float, Sequence[float]] = 1.0, brightness: int = 255
+    ):
+        if isinstance(gamma, (int, float)):
+            gamma = [gamma] * 4
+        self.gamma = [float(g) for g in gamma]  # r, g, b, w
+        self.set_brightness(brightness)
+
+    @property
+    def identity(self) -> bool:
+        return self.brightness == 255 and all(g == 1.0 for g in self.gamma)
+
+    def set_brightness(self, brightness: int):
+        self.brightness = min(max(int(brightness), 0), 255)
+        # Indexed by byte position, so apply() never has to unpack colors
+        luts = np.empty((4, 256), dtype=np.uint8)
+        for channel, offset in enumerate(_OFFSETS):
+            luts[offset] = build_lut(self.gamma[channel], self.brightness)
+        self.luts = luts  # Swapped whole, the output thread may be reading
+
+    def apply(self, colors: np.ndarray) -> np.ndarray:
+        """Correct an array of packed colors."""
+        if self.identity:
+            return colors
+        channels = np.ascontiguousarray(colors, dtype=np.uint32).view(np.uint8)
+        channels = channels.reshape(-1, 4)
+        corrected = np.empty_like(channels)
+        luts = self.luts
+        for offset in range(4):
+            corrected[:, offset] = luts[offset][channels[:, offset]]
+        return corrected.view(np.uint32).ravel()
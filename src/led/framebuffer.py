@@ -0,0 +1,423 @@
+"""Contiguous timeline storage for a group of LEDs"""
+
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import numpy as np
+
+from .cache import SEQUENCES
+from .patterns import Pattern, run_lengths
+
+DEFAULT_CAPACITY = 64
+# Patterns longer than this are evaluated on the fly instead of stored
+MATERIALIZE_LIMIT = 512
+# Steps that hold each color this many frames on average are stored as runs
+MIN_AVERAGE_RUN = 8
+
+
+@dataclass
+class Clip:
+    """A pattern queued on some pixels but only evaluated when displayed."""
+
+    pattern: Pattern
+    start_color: Union[int, np.ndarray]  # one for all columns, or one per column
+    cols: np.ndarray
+    begin: np.ndarray  # first frame of the clip, per column
+    length: int
+    lead: Optional[int] = None  # shown while a column waits out its offset
+    offsets: Optional[np.ndarray] = None  # frames each column waits before begin
+    shifts: Optional[np.ndarray] = None  # frames each column runs ahead in pattern
+
+    def render(self, cursor: np.ndarray, live: np.ndarray, out: np.ndarray):
+        """Write the colors of live pixels that are inside this clip into ``out``."""
+        k = cursor[self.cols] - self.begin
+        hit = live[self.cols] & (k >= 0) & (k < self.length)
+        if hit.all():
+            # Usual case once a clip is running; skip the masking
+            frames = k if self.shifts is None else k + self.shifts
+            out[self.cols] = self._colors(frames, slice(None))
+        elif hit.any():
+            frames = k[hit] if self.shifts is None else k[hit] + self.shifts[hit]
+            out[self.cols[hit]] = self._colors(frames, hit)
+        if self.lead is not None:
+            waiting = live[self.cols] & (k < 0) & (k >= -self.offsets)
+            out[self.cols[waiting]] = self.lead
+
+    def _colors(self, frames: np.ndarray, picked) -> np.ndarray:
+        """Colors at ``frames`` for the ``picked`` columns of the clip."""
+        if np.ndim(self.start_color):
+            return self.pattern.colors_each(frames, self.start_color[picked])
+        return self.pattern.colors_at(frames, self.start_color)
+
+    def drop(self, mask: np.ndarray):
+        """Forget the columns set in ``mask``."""
+        keep = ~mask[self.cols]
+        self.cols = self.cols[keep]
+        self.begin = self.begin[keep]
+        if np.ndim(self.start_color):
+            self.start_color = self.start_color[keep]
+        if self.offsets is not None:
+            self.offsets = self.offsets[keep]
+        if self.shifts is not None:
+            self.shifts = self.shifts[keep]
+
+
+class FrameBuffer:
+    """Queued color steps for a run of pixels, stored as one (frames x pixels) array.
+
+    Column ``i`` holds the steps of pixel ``i``. Each pixel keeps its own cursor,
+    length and active flag so pixels can still be started and stopped on their
+    own, but advancing a frame is a single vectorized gather over all of them.
+
+    Long patterns are not written into the array. They are kept as Clips after
+    the stored steps and evaluated in closed form each frame, so a long hold or
+    many loops costs no memory. Patterns that mostly hold a color, like Solid
+    and Blink, are kept as Clips of (color, run length) pairs at any length.
+    Once a pixel has a clip queued, later patterns for that pixel are queued
+    as clips too.
+    """
+
+    def __init__(self, size: int, capacity: int = DEFAULT_CAPACITY):
+        self.size = max(size, 0)
+        self.frames = np.zeros((capacity, self.size), dtype=np.uint32)
+        self.lengths = np.zeros(self.size, dtype=np.int64)  # stored + clip frames
+        self.stored = np.zeros(self.size, dtype=np.int64)  # frames in the array
+        self.tails = np.zeros(self.size, dtype=np.uint32)
+        self.clips: list[Clip] = []
+        self.cursor = np.zeros(self.size, dtype=np.int64)
+        self.active = np.zeros(self.size, dtype=bool)
+        self.current = np.zeros(self.size, dtype=np.uint32)
+        # Set whenever a pixel changes color and cleared by whoever pushes it out
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return self.size
+
+    def tail(self, col: int) -> int:
+        """Color a pixel will show once its queued steps are done."""
+        if self.lengths[col]:
+            return int(self.tails[col])
+        return int(self.current[col])
+
+    def steps(self, col: int) -> list[int]:
+        """Copy of the queued steps for one pixel."""
+        steps = self.frames[: self.stored[col], col].tolist()
+        for clip in self.clips:
+            if col in clip.cols:
+                at = clip.cols == col
+                if clip.offsets is not None:
+                    wait = int(clip.offsets[at][0])
+                    held = steps[-1] if steps else int(self.current[col])
+                    steps += [held if clip.lead is None else clip.lead] * wait
+                frames = np.arange(clip.length)
+                if clip.shifts is not None:
+                    frames += int(clip.shifts[at][0])
+                start_color = clip.start_color
+                if np.ndim(start_color):
+                    start_color = int(start_color[at][0])
+                steps += clip.pattern.colors_at(frames, start_color).tolist()
+        return steps
+
+    def extend(self, cols, steps) -> None:
+        """Queue the same steps on every pixel in ``cols``."""
+        steps = np.asarray(steps, dtype=np.uint32)
+        cols = np.atleast_1d(np.asarray(cols, dtype=np.int64))
+        if not len(steps) or not len(cols):
+            return
+
+        # Pixels that already have clips queued keep their timeline in order
+        clipped = self.lengths[cols] > self.stored[cols]
+        if clipped.any():
+            self._add_clip(cols[clipped], _stored(steps), 0, len(steps))
+
+        dense = cols[~clipped]
+        if len(dense):
+            begins = self.stored[dense]
+            self._reserve(int(begins.max()) + len(steps))
+            for begin in np.unique(begins).tolist():
+                group = dense[begins == begin]
+                self.frames[begin : begin + len(steps), group] = steps[:, None]
+            self.stored[dense] += len(steps)
+            self.lengths[dense] += len(steps)
+            self.tails[dense] = steps[-1]
+
+    def add_pattern(
+        self, cols, pattern: Pattern, num_loops: int = 1, shifts=None
+    ) -> None:
+        """Queue a pattern on every pixel in ``cols``.
+
+        Pixels starting from the same color share one cached sequence; when
+        they start from many colors, all the sequences are computed in one
+        call. Long patterns are queued as clips instead of being stored.
+
+        ``shifts`` runs each pixel that many frames ahead in the pattern, e.g.
+        to spread a rainbow along the strip. Shifted patterns are always
+        queued as clips and evaluated for the whole run of pixels each frame.
+        """
+        pattern = pattern.frozen()
+        length = pattern.frame_count(num_loops)
+        cols = np.atleast_1d(np.asarray(cols, dtype=np.int64))
+        if length <= 0 or not len(cols):
+            return
+
+        starts = np.where(self.lengths[cols] > 0, self.tails[cols], self.current[cols])
+        uniq, inverse = np.unique(starts, return_inverse=True)
+        if shifts is not None or length > MATERIALIZE_LIMIT:
+            # One clip, keeping each pixel's start color only if it matters
+            start_color = starts
+            if len(uniq) == 1 or not pattern.uses_current_color:
+                start_color = int(uniq[0])
+            if shifts is not None:
+                shifts = np.broadcast_to(np.asarray(shifts, dtype=np.int64), cols.shape)
+                shifts = shifts.copy()
+            self._add_clip(cols, pattern, start_color, length, shifts)
+            return
+        if self._add_runs(cols, starts, uniq, pattern, num_loops, length):
+            return
+        if len(uniq) == 1:
+            self.extend(cols, SEQUENCES.get(pattern, int(uniq[0]), num_loops))
+            return
+
+        rows = pattern.colors_from(np.arange(length), uniq)
+        clipped = self.lengths[cols] > self.stored[cols]
+        if not clipped.all():
+            self._extend_rows(cols[~clipped], rows[inverse[~clipped]])
+        for group in np.unique(inverse[clipped]).tolist():
+            self.extend(cols[clipped & (inverse == group)], rows[group])
+
+    def _add_runs(self, cols, starts, uniq, pattern, num_loops, length) -> bool:
+        """Queue a mostly holding pattern as runs; False if it changes too often."""
+        if length < MIN_AVERAGE_RUN:
+            return False
+        # Start colors giving the same runs share a clip, e.g. all of them for
+        # patterns that ignore the color they start from
+        groups: dict[tuple, tuple] = {}
+        for start_color in uniq.tolist():
+            runs = pattern.runs(start_color, num_loops)
+            if runs is None or len(runs[0]) * MIN_AVERAGE_RUN > length:
+                return False
+            key = (runs[0].tobytes(), runs[1].tobytes())
+            groups.setdefault(key, (runs, []))[1].append(start_color)
+        for (colors, lengths), group_starts in groups.values():
+            group = cols[np.isin(starts, group_starts)]
+            self._add_clip(group, _Runs(colors, lengths), 0, length)
+        return True
+
+    def _extend_rows(self, cols: np.ndarray, rows: np.ndarray):
+        """Queue a different sequence on each pixel, ``rows[i]`` on ``cols[i]``."""
+        begins = self.stored[cols]
+        steps = rows.shape[1]
+        self._reserve(int(begins.max()) + steps)
+        self.frames[begins[:, None] + np.arange(steps), cols[:, None]] = rows
+        self.stored[cols] += steps
+        self.lengths[cols] += steps
+        self.tails[cols] = rows[:, -1]
+
+    def add_phased(
+        self, cols, patterns: list[Pattern], offsets, lead: Optional[int] = None
+    ) -> None:
+        """Queue one chain of patterns on many pixels, each delayed by an offset.
+
+        The chain is stored once per start color and every pixel reads it
+        through its own offset, so memory grows with the number of pixels plus
+        the chain length rather than their product. While waiting, pixels show
+        ``lead`` if given (and then start the chain from it), otherwise they
+        hold their previous color.
+        """
+        cols = np.atleast_1d(np.asarray(cols, dtype=np.int64))
+        offsets = np.broadcast_to(np.asarray(offsets, dtype=np.int64), cols.shape)
+        tails = np.where(self.lengths[cols] > 0, self.tails[cols], self.current[cols])
+        starts = tails if lead is None else np.where(offsets > 0, lead, tails)
+
+        for start_color in np.unique(starts).tolist():
+            steps = self._chain(patterns, start_color)
+            if not len(steps):
+                continue
+            group = starts == start_color
+            group_cols = cols[group]
+            begin = self.lengths[group_cols] + offsets[group]
+            self.clips.append(
+                Clip(
+                    _stored(steps),
+                    0,
+                    group_cols,
+                    begin,
+                    len(steps),
+                    lead,
+                    offsets[group].copy(),
+                )
+            )
+            self.lengths[group_cols] = begin + len(steps)
+            self.tails[group_cols] = steps[-1]
+
+    @staticmethod
+    def _chain(patterns: list[Pattern], start_color: int) -> np.ndarray:
+        parts = []
+        color = start_color
+        for pattern in patterns:
+            steps = SEQUENCES.get(pattern, color)
+            if len(steps):
+                parts.append(steps)
+                color = int(steps[-1])
+        if not parts:
+            return np.empty(0, dtype=np.uint32)
+        return np.concatenate(parts)
+
+    def _add_clip(
+        self,
+        cols: np.ndarray,
+        pattern: Pattern,
+        start_color: Union[int, np.ndarray],
+        length: int,
+        shifts: Optional[np.ndarray] = None,
+    ):
+        begin = self.lengths[cols].copy()
+        clip = Clip(pattern, start_color, cols, begin, length, shifts=shifts)
+        self.clips.append(clip)
+        self.lengths[cols] += length
+        last = length - 1 if shifts is None else length - 1 + shifts
+        self.tails[cols] = clip._colors(np.broadcast_to(last, cols.shape), slice(None))
+
+    def _reserve(self, rows: int):
+        capacity = len(self.frames)
+        if rows <= capacity:
+            return
+        grown = np.zeros((max(rows, capacity * 2), self.size), dtype=np.uint32)
+        grown[:capacity] = self.frames
+        self.frames = grown
+
+    def start(self, cols=None):
+        """Rewind and activate pixels.
+
+        With no ``cols``, only idle pixels that have queued steps are started, so
+        pixels that are already running are left alone.
+        """
+        if cols is None:
+            cols = ~self.active & (self.lengths > 0)
+        self.active[cols] = True
+        self.cursor[cols] = 0
+
+    def stop(self, cols=slice(None)):
+        self.active[cols] = False
+
+    def cut(self, cols=slice(None)):
+        """Drop queued steps and stop pixels, holding the color they show."""
+        self.active[cols] = False
+        self.lengths[cols] = 0
+        self.stored[cols] = 0
+        self.cursor[cols] = 0
+        if self.clips:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[cols] = True
+            self._drop_clips(mask)
+        if not self.lengths.any():
+            self._shrink()
+
+    def reset(self, cols=slice(None)):
+        """Drop queued steps and turn pixels off."""
+        self.cut(cols)
+        self.current[cols] = 0
+        self.dirty = True
+
+    def _drop_clips(self, mask: np.ndarray):
+        for clip in self.clips:
+            clip.drop(mask)
+        self.clips = [clip for clip in self.clips if len(clip.cols)]
+
+    def _shrink(self):
+        if len(self.frames) > DEFAULT_CAPACITY:
+            self.frames = np.zeros((DEFAULT_CAPACITY, self.size), dtype=np.uint32)
+
+    def advance(self, frames: int = 1) -> tuple[np.ndarray, np.ndarray]:
+        """Step every active pixel forward ``frames`` frames.
+
+        Pixels that ran out of steps are stopped and their finished steps are
+        dropped, so the next pattern starts from an empty timeline. Skipped
+        frames are never rendered; a pixel that would skip past its end shows
+        its last step first.
+
+        Returns:
+            The columns whose color changed and their new colors. Pixels that
+            are active but holding the same color are left out.
+        """
+        finished = self.active & (self.cursor >= self.lengths)
+        if finished.any():
+            self.active[finished] = False
+            self.cursor[finished] = 0
+            self.lengths[finished] = 0
+            self.stored[finished] = 0
+            if self.clips:
+                self._drop_clips(finished)
+            if not self.lengths.any():
+                self._shrink()
+
+        cols = np.flatnonzero(self.active)
+        if frames > 1:
+            last = np.maximum(self.lengths[cols] - 1, 0)
+            self.cursor[cols] = np.minimum(self.cursor[cols] + frames - 1, last)
+        before = self.current[cols]
+        self._render(cols, self.active)
+        after = self.current[cols]
+        changed = after != before
+        if changed.any():
+            self.dirty = True
+        return cols[changed], after[changed]
+
+    def step(self, col: int) -> int:
+        """Advance a single pixel one frame and return its color."""
+        live = np.zeros(self.size, dtype=bool)
+        live[col] = True
+        self._render(np.array([col]), live)
+        return int(self.current[col])
+
+    def _render(self, cols: np.ndarray, live: np.ndarray):
+        stored = self.cursor[cols] < self.stored[cols]
+        self.current[cols[stored]] = self.frames[
+            self.cursor[cols[stored]], cols[stored]
+        ]
+        for clip in self.clips:
+            clip.render(self.cursor, live, self.current)
+        self.cursor[cols] += 1
+
+
+class _Steps(Pattern):
+    """Already generated steps, wrapped so they can be queued as a Clip."""
+
+    uses_current_color = False
+
+    def __init__(self, steps: np.ndarray):
+        self.steps = steps
+
+    @property
+    def cycle_frames(self) -> int:
+        return len(self.steps)
+
+    def colors_at(self, frames: np.ndarray, current_color: int) -> np.ndarray:
+        return self.steps[frames]
+
+
+class _Runs(Pattern):
+    """Steps stored run-length encoded, one entry per run of a color."""
+
+    uses_current_color = False
+
+    def __init__(self, colors: np.ndarray, lengths: np.ndarray):
+        self.colors = np.asarray(colors, dtype=np.uint32)
+        self.ends = np.cumsum(lengths)  # Frame after the last of each run
+
+    @property
+    def cycle_frames(self) -> int:
+        return int(self.ends[-1]) if len(self.ends) else 0
+
+    def colors_at(self, frames: np.ndarray, current_color: int) -> np.ndarray:
+        if len(self.colors) == 1:
+            return np.full(np.shape(frames), self.colors[0], dtype=np.uint32)
+        return self.colors[np.searchsorted(self.ends, frames, side="right")]
+
+
+def _stored(steps: np.ndarray) -> Pattern:
+    """Generated steps wrapped for a Clip, as runs if they mostly hold."""
+    colors, lengths = run_lengths(steps)
+    if len(colors) * MIN_AVERAGE_RUN <= len(steps):
+        return _Runs(colors, lengths)
+    return _Steps(steps)
@@ -0,0 +1,60 @@
+"""Lookup of the segment that owns each LED"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def find_overlaps(spans: Dict[str, Tuple[int, int]]) -> List[Tuple[str, str]]:
+    """Pairs of segments whose inclusive (start, end) LED spans share LEDs."""
+    ordered = sorted(spans.items(), key=lambda item: item[1][0])
+    overlaps = []
+    for i, (name, (_, end)) in enumerate(ordered):
+        j = i + 1
+        while j < len(ordered) and ordered[j][1][0] <= end:
+            overlaps.append((name, ordered[j][0]))
+            j += 1
+    return overlaps
+
+
+class LayoutIndex:
+    """The segments of a layout compiled into a flat LED -> segment array.
+
+    ``owner[led]`` is the position in ``names`` of the segment that shows the
+    LED, or -1 when no segment covers it. Segments are drawn in order, so
+    where two overlap the later one owns the shared LEDs; the pairs are kept
+    in ``overlaps``.
+    """
+
+    def __init__(self, spans: Dict[str, Tuple[int, int]], size: int = 0):
+        self.names = list(spans)
+        self.spans = dict(spans)
+        end = max((end for _, end in spans.values()), default=-1)
+        self.owner = np.full(max(size, end + 1), -1, dtype=np.int32)
+        for i, (start, end) in enumerate(spans.values()):
+            self.owner[max(start, 0) : end + 1] = i
+        self.overlaps = find_overlaps(spans)
+
+    def __len__(self) -> int:
+        return len(self.owner)
+
+    def segment_at(self, led: int) -> Optional[str]:
+        """Name of the segment showing ``led``, if any."""
+        if not 0 <= led < len(self.owner):
+            return None
+        i = self.owner[led]
+        return self.names[i] if i >= 0 else None
+
+    def split(self, start: int, end: int) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Group LEDs ``start`` to ``end`` inclusive by the segment showing them.
+
+        Returns:
+            The LEDs of each segment in the range, by name, and the LEDs no
+            segment covers.
+        """
+        leds = np.arange(max(start, 0), min(end + 1, len(self.owner)))
+        owners = self.owner[leds]
+        groups = {
+            self.names[i]: leds[owners == i] for i in np.unique(owners) if i >= 0
+        }
+        return groups, leds[owners < 0]
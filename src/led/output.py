@@ -0,0 +1,96 @@
+"""Output stage between the rendered frame and the strip driver"""
+
+from typing import Optional
+
+import numpy as np
+
+from .correction import ColorCorrection
+
+
+class FrameOutput:
+    """A strip-wide frame, compared against the strip before it is sent.
+
+    Segments write their changed pixels into ``frame``. ``push`` corrects and
+    compares the span written since the last push in one vectorized pass,
+    and calls the driver's ``setPixelColor`` only for the LEDs whose color
+    actually changed. Colors are gamma and brightness corrected on the way
+    out; ``frame`` keeps them as rendered.
+    """
+
+    def __init__(
+        self, strip, size: int, correction: Optional[ColorCorrection] = None
+    ):
+        self.strip = strip
+        self.correction = correction or ColorCorrection()
+        self.frame = np.zeros(size, dtype=np.uint32)
+        self._shown = np.zeros(size, dtype=np.uint32)
+        # Span of the frame written since the last push
+        self._lo = size
+        self._hi = 0
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _mark(self, lo: int, hi: int):
+        self._lo = min(self._lo, lo)
+        self._hi = max(self._hi, hi)
+
+    def write(self, indices: np.ndarray, colors: np.ndarray):
+        """Set the LEDs at ``indices``; indices past the strip are ignored."""
+        keep = indices < len(self.frame)
+        indices = indices[keep]
+        if not len(indices):
+            return
+        self.frame[indices] = colors[keep]
+        self._mark(int(indices.min()), int(indices.max()) + 1)
+
+    def fill(self, start: int, end: int, color: int):
+        """Set LEDs ``start`` to ``end`` inclusive to one color."""
+        start = max(start, 0)
+        end = min(end + 1, len(self.frame))
+        if start >= end:
+            return
+        self.frame[start:end] = color
+        self._mark(start, end)
+
+    def set_brightness(self, brightness: int):
+        """Change the global brightness; the whole frame is sent again."""
+        self.correction.set_brightness(brightness)
+        self._mark(0, len(self.frame))
+
+    def set_correction(self, correction: ColorCorrection):
+        """Swap the gamma and brightness tables; the whole frame is sent again."""
+        self.correction = correction
+        self._mark(0, len(self.frame))
+
+    def take(self) -> tuple[int, int]:
+        """Return and reset the span written since the last call."""
+        lo, hi = self._lo, self._hi
+        self._lo, self._hi = len(self.frame), 0
+        return lo, hi
+
+    def send(self, frame: np.ndarray, lo: int, hi: int) -> bool:
+        """Send the part of ``frame[lo:hi]`` that differs from the strip."""
+        if lo >= hi:
+            return False
+        colors = self.correction.apply(frame[lo:hi])
+        changed = np.flatnonzero(colors != self._shown[lo:hi])
+        if not len(changed):
+            return False
+        colors = colors[changed]
+        leds = changed + lo
+        # rpi_ws281x has no bulk write: slice assignment sets every LED in the
+        # slice to one value, so each changed LED is set on its own
+        set_pixel = self.strip.setPixelColor
+        for led, color in zip(leds.tolist(), colors.tolist()):
+            set_pixel(led, color)
+        self._shown[leds] = colors
+        return True
+
+    def push(self) -> bool:
+        """Send changed LEDs to the strip.
+
+        Returns:
+            Whether anything was sent, i.e. whether ``show()`` is needed.
+        """
+        return self.send(self.frame, *self.take())
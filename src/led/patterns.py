@@ -1,6 +1,13 @@
 import math
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from .clock import SHOW_CLOCK
+from .colormath import ONE, lerp, lerp_color, weights
 
 try:
     from rpi_ws281x import Color
@@ -16,115 +23,219 @@ def interpolate_color(
     """Interpolate between two colors."""
     if total_steps <= 0:
         return end_color
+    weight = min(max((step * ONE + total_steps // 2) // total_steps, 0), ONE)
+    return lerp_color(start_color, end_color, weight)
 
-    start_w = (start_color >> 24) & 0xFF
-    start_r = (start_color >> 16) & 0xFF
-    start_g = (start_color >> 8) & 0xFF
-    start_b = start_color & 0xFF
 
-    end_w = (end_color >> 24) & 0xFF
-    end_r = (end_color >> 16) & 0xFF
-    end_g = (end_color >> 8) & 0xFF
-    end_b = end_color & 0xFF
+def run_lengths(steps) -> tuple[np.ndarray, np.ndarray]:
+    """Colors and lengths of the runs of repeated colors in ``steps``."""
+    steps = np.asarray(steps, dtype=np.uint32)
+    if not len(steps):
+        return steps, np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, steps[1:] != steps[:-1]])
+    return steps[starts], np.diff(np.r_[starts, len(steps)])
 
-    ratio = step / total_steps
 
-    new_w = int(start_w + (end_w - start_w) * ratio)
-    new_r = int(start_r + (end_r - start_r) * ratio)
-    new_g = int(start_g + (end_g - start_g) * ratio)
-    new_b = int(start_b + (end_b - start_b) * ratio)
+def _build_wheel() -> np.ndarray:
+    """Colors for hue positions 0-255, red to green to blue and back."""
+    pos = np.arange(256)
+    rising = np.select([pos < 85, pos < 170], [pos, pos - 85], pos - 170) * 3
+    falling = 255 - rising
+    zero = np.zeros_like(pos)
+    r = np.select([pos < 85, pos < 170], [rising, falling], zero)
+    g = np.select([pos < 85, pos < 170], [falling, zero], rising)
+    b = np.select([pos < 85, pos < 170], [zero, rising], falling)
+    return ((r << 16) | (g << 8) | b).astype(np.uint32)
 
-    return (new_w << 24) | (new_r << 16) | (new_g << 8) | new_b
+
+# Hue wheel lookup table, computed once
+WHEEL = _build_wheel()
 
 
 class Pattern(ABC):
-    """Base class for LED patterns."""
+    """Base class for LED patterns.
+
+    A pattern is evaluated in closed form: ``colors_at`` returns the color at
+    any frame offset without building the rest of the sequence, so memory does
+    not grow with the duration or loop count. ``generate`` materializes the
+    whole run for callers that still want a list.
+
+    Durations are in frames, or in milliseconds through the ``*_ms`` fields,
+    which take precedence and are converted at the show's frame rate.
+    Queued patterns are ``frozen`` first, so a frame rate change does not
+    change the length of a pattern that is already running.
+    """
+
+    # False for patterns whose colors do not depend on the color they start from
+    uses_current_color = True
+    # Each millisecond field and the frame count field it takes precedence over
+    ms_fields = {"duration_ms": "duration_frames"}
+
+    @property
+    @abstractmethod
+    def cycle_frames(self) -> int:
+        """Number of frames in one loop of the pattern."""
+        pass
 
     @abstractmethod
+    def colors_at(self, frames: np.ndarray, current_color: int) -> np.ndarray:
+        """Colors at the given frame offsets, counted from the first loop."""
+        pass
+
+    def frame_count(self, num_loops: int = 1) -> int:
+        return self.cycle_frames * num_loops
+
+    def frozen(self) -> "Pattern":
+        """The pattern with its ``*_ms`` durations fixed at the current frame rate."""
+        changes = {}
+        for ms_field, frames_field in self.ms_fields.items():
+            ms = getattr(self, ms_field, None)
+            if ms is not None:
+                frames = SHOW_CLOCK.duration(getattr(self, frames_field), ms)
+                changes.update({ms_field: None, frames_field: frames})
+        return replace(self, **changes) if changes else self
+
+    def colors_from(self, frames: np.ndarray, current_colors: np.ndarray) -> np.ndarray:
+        """Colors at ``frames`` for each of several current colors, one row each."""
+        return np.stack([self.colors_at(frames, int(c)) for c in current_colors])
+
+    def colors_each(self, frames: np.ndarray, current_colors: np.ndarray) -> np.ndarray:
+        """Color at ``frames[i]`` starting from ``current_colors[i]``, for each i."""
+        if not self.uses_current_color:
+            return self.colors_at(frames, 0)
+        frames = np.asarray(frames)
+        uniq, inverse = np.unique(current_colors, return_inverse=True)
+        if len(uniq) == 1:
+            return self.colors_at(frames, int(uniq[0]))
+        out = np.empty(frames.shape, dtype=np.uint32)
+        for i, color in enumerate(uniq.tolist()):
+            group = inverse == i
+            out[group] = self.colors_at(frames[group], color)
+        return out
+
+    def runs(
+        self, current_color: int, num_loops: int = 1
+    ) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """The sequence as (colors, run lengths), for patterns that mostly hold.
+
+        None for patterns whose color changes most frames.
+        """
+        return None
+
+    def color_at(self, frame: int, current_color: int) -> int:
+        """Color at a single frame offset."""
+        return int(self.colors_at(np.array([frame]), current_color)[0])
+
+    def iter_colors(self, current_color: int, num_loops: int = 1, chunk: int = 256):
+        """Yield the sequence lazily, ``chunk`` frames at a time."""
+        total = self.frame_count(num_loops)
+        for begin in range(0, total, chunk):
+            frames = np.arange(begin, min(begin + chunk, total))
+            yield from self.colors_at(frames, current_color).tolist()
+
     def generate(self, current_color: int, num_loops: int = 1) -> list[int]:
         """Generate a sequence of color steps."""
-        pass
+        return list(self.iter_colors(current_color, num_loops))
 
 
 @dataclass
 class Solid(Pattern):
+    uses_current_color = False
+
     color: int
     duration_frames: int = 1
+    duration_ms: Optional[float] = None
 
-    def generate(self, current_color: int, num_loops: int = 1) -> list[int]:
-        steps = []
-        for _ in range(num_loops):
-            steps.extend([self.color] * self.duration_frames)
-        return steps
+    @property
+    def cycle_frames(self) -> int:
+        return SHOW_CLOCK.duration(self.duration_frames, self.duration_ms)
+
+    def colors_at(self, frames: np.ndarray, current_color: int) -> np.ndarray:
+        return np.full(len(frames), self.color, dtype=np.uint32)
+
+    def runs(self, current_color: int, num_loops: int = 1):
+        return (
+            np.array([self.color], dtype=np.uint32),
+            np.array([self.frame_count(num_loops)], dtype=np.int64),
+        )
 
 
 @dataclass
 class Fade(Pattern):
     target_color: int
-    duration_frames: int
+    duration_frames: int = 1
+    duration_ms: Optional[float] = None
 
-    def generate(self, current_color: int, num_loops: int = 1) -> list[int]:
-        steps = []
-        start = current_color
-        for _ in range(num_loops):
-            # If looping, subsequent loops start from the end of the previous
-            # But Fade usually transitions A -> B.
-            # If we loop, do we snap back?
-            # For this implementation, let's assume each loop performs the fade A->B.
-            # But A changes.
-            # Actually, usually Fade is A->B.
-            # If we loop, maybe we want A->B->A?
-            # Or just A->B, A->B? (which looks like snap back)
-
-            # Let's handle the single fade sequence.
-            cycle_steps = []
-            for i in range(1, self.duration_frames + 1):
-                cycle_steps.append(
-                    interpolate_color(start, self.target_color, i, self.duration_frames)
-                )
-            steps.extend(cycle_steps)
-            start = self.target_color  # Next loop starts from target
-
-        return steps
+    @property
+    def cycle_frames(self) -> int:
+        return SHOW_CLOCK.duration(self.duration_frames, self.duration_ms)
+
+    def colors_at(self, frames: np.ndarray, current_color) -> np.ndarray:
+        # The first loop fades from the current color to the target. Later
+        # loops start from the target, so they simply hold it (a weight of
+        # ONE). An array of current colors broadcasts against ``frames``.
+        duration = self.cycle_frames
+        steps = np.minimum(np.asarray(frames) + 1, duration)
+        return lerp(current_color, self.target_color, weights(steps, duration))
+
+    def colors_from(self, frames: np.ndarray, current_colors: np.ndarray) -> np.ndarray:
+        # Every start color's fade in one broadcast lerp
+        return self.colors_at(frames, np.asarray(current_colors)[:, None])
+
+    def colors_each(self, frames: np.ndarray, current_colors: np.ndarray) -> np.ndarray:
+        return self.colors_at(frames, np.asarray(current_colors))
 
 
 @dataclass
 class Blink(Pattern):
+    uses_current_color = False
+    ms_fields = {"on_ms": "on_duration", "off_ms": "off_duration"}
+
     color: int
     off_color: int = 0
     on_duration: int = 10
     off_duration: int = 10
+    on_ms: Optional[float] = None
+    off_ms: Optional[float] = None
 
-    def generate(self, current_color: int, num_loops: int = 1) -> list[int]:
-        steps = []
-        for _ in range(num_loops):
-            steps.extend([self.color] * self.on_duration)
-            steps.extend([self.off_color] * self.off_duration)
-        return steps
+    @property
+    def on_frames(self) -> int:
+        return SHOW_CLOCK.duration(self.on_duration, self.on_ms)
+
+    @property
+    def cycle_frames(self) -> int:
+        return self.on_frames + SHOW_CLOCK.duration(self.off_duration, self.off_ms)
+
+    def colors_at(self, frames: np.ndarray, current_color: int) -> np.ndarray:
+        on = np.asarray(frames) % self.cycle_frames < self.on_frames
+        return np.where(on, self.color, self.off_color).astype(np.uint32)
+
+    def runs(self, current_color: int, num_loops: int = 1):
+        on = self.on_frames
+        colors = np.array([self.color, self.off_color], dtype=np.uint32)
+        lengths = np.array([on, self.cycle_frames - on], dtype=np.int64)
+        return np.tile(colors, num_loops), np.tile(lengths, num_loops)
 
 
 @dataclass
 class Rainbow(Pattern):
     """Cycles through rainbow colors."""
 
+    uses_current_color = False
+
     duration_frames: int = 255  # Frames to complete one full cycle
+    duration_ms: Optional[float] = None
 
-    def generate(self, current_color: int, num_loops: int = 1) -> list[int]:
-        def wheel(pos):
-            """Generate rainbow colors across 0-255 positions."""
-            if pos < 85:
-                return Color(pos * 3, 255 - pos * 3, 0)
-            elif pos < 170:
-                pos -= 85
-                return Color(255 - pos * 3, 0, pos * 3)
-            else:
-                pos -= 170
-                return Color(0, pos * 3, 255 - pos * 3)
-
-        steps = []
-        for _ in range(num_loops):
-            for i in range(self.duration_frames):
-                # Map i to 0-255
-                hue = int((i / self.duration_frames) * 255)
-                steps.append(wheel(hue))
-        return steps
+    @property
+    def cycle_frames(self) -> int:
+        return SHOW_CLOCK.duration(self.duration_frames, self.duration_ms)
+
+    def colors_at(self, frames: np.ndarray, current_color: int) -> np.ndarray:
+        cycle = self.cycle_frames
+        return _rainbow_cycle(cycle)[np.asarray(frames) % cycle]
+
+
+@lru_cache(maxsize=16)
+def _rainbow_cycle(duration_frames: int) -> np.ndarray:
+    """One cycle of Rainbow colors, mapping each frame to a 0-255 position."""
+    return WHEEL[np.arange(duration_frames) * 255 // duration_frames]
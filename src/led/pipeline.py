@@ -0,0 +1,110 @@
+"""Pipelined output: push one frame while the next is rendered"""
+
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from .output import FrameOutput
+
+
+class OutputPipeline:
+    """Double-buffered hand-off between the render thread and an output thread.
+
+    ``submit`` copies the finished frame into whichever of two slots is free
+    and hands it over by flipping an index; the output thread pushes it to the
+    strip and calls ``show()`` while the render thread goes on to build the
+    next frame. The threads only meet through two Events, so neither ever
+    holds a lock while the other is working. If the output thread is still
+    busy with the previous frame, ``submit`` waits for it rather than drop a
+    frame.
+
+    An error from the driver is raised again from the next ``submit``, on
+    the render thread, and the output thread keeps going.
+
+    How much this overlaps depends on the driver releasing the GIL while it
+    waits on the wire.
+    """
+
+    def __init__(self, output: FrameOutput, on_show=None):
+        self.output = output
+        self.on_show = on_show  # called with the seconds spent in push + show
+        self._slots = [np.zeros_like(output.frame), np.zeros_like(output.frame)]
+        self._span = [(0, 0), (0, 0)]
+        self._back = 0  # slot the render thread fills next
+        self._front = 1  # slot the output thread sends
+        self._ready = threading.Event()
+        self._free = threading.Event()
+        self._free.set()
+        self._running = False
+        self._thread = None
+        self._error: Optional[Exception] = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._output_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Finish the frame in flight and stop the output thread."""
+        self._wait_free()
+        self._running = False
+        self._ready.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self) -> bool:
+        """Hand the rendered frame to the output thread.
+
+        Returns:
+            Whether there was anything to send.
+        """
+        self._raise_error()
+        lo, hi = self.output.take()
+        if lo >= hi:
+            return False
+
+        if not self._wait_free():
+            raise RuntimeError("Output thread is not running")
+        self._raise_error()
+        slot = self._back
+        np.copyto(self._slots[slot], self.output.frame)
+        self._span[slot] = (lo, hi)
+        # Swap: the filled slot becomes the front, the old front the back
+        self._back, self._front = self._front, slot
+        self._free.clear()
+        self._ready.set()
+        return True
+
+    def _output_loop(self):
+        while True:
+            self._ready.wait()
+            self._ready.clear()
+            if not self._running:
+                break
+            slot = self._front
+            start = time.perf_counter()
+            try:
+                if self.output.send(self._slots[slot], *self._span[slot]):
+                    self.output.strip.show()
+                if self.on_show is not None:
+                    self.on_show(time.perf_counter() - start)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._free.set()
+
+    def _wait_free(self) -> bool:
+        """Wait for the output thread to finish its frame. False if it is gone."""
+        while not self._free.wait(0.5):
+            if self._thread is None or not self._thread.is_alive():
+                return False
+        return True
+
+    def _raise_error(self):
+        """Raise, once, the error the output thread last ran into."""
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
@@ -32,6 +32,7 @@ except ImportError:
             return 0
 
 
+from .framebuffer import FrameBuffer
 from .patterns import Pattern
 
 
@@ -55,56 +56,74 @@ class Colors:
     LIME: int = Color(50, 205, 50)
 
 
-@dataclass
+@dataclass(slots=True)
 class Pixel:
+    """A single LED, viewed through a column of a FrameBuffer.
+
+    A Pixel created on its own gets a private one-pixel buffer and starts off.
+    The Pixels of a StripSegment are views onto columns of the segment's
+    buffer, made when asked for; the state itself lives in the buffer arrays.
+    """
+
     strip: PixelStrip
     idx: int
-    _current: int = field(init=False, repr=False, default=0)
-    _steps: list[int] = field(init=False, repr=False, default_factory=list)
-    _step_num: int = field(init=False, repr=False, default=0)
-    _active: bool = field(init=False, repr=False, default=False)
+    buffer: FrameBuffer = field(default=None, repr=False)
+    col: int = field(default=0, repr=False)
 
     def __post_init__(self):
-        self.reset()
+        if self.buffer is None:
+            self.buffer = FrameBuffer(1)
+            self.col = 0
+            self.reset()
+
+    @property
+    def _current(self) -> int:
+        return int(self.buffer.current[self.col])
+
+    @property
+    def _steps(self) -> list[int]:
+        return self.buffer.steps(self.col)
+
+    @property
+    def _step_num(self) -> int:
+        return int(self.buffer.cursor[self.col])
+
+    @property
+    def _active(self) -> bool:
+        return bool(self.buffer.active[self.col])
 
     def add_pattern(self, pattern: Pattern, **kwargs):
-        """Add the steps of a Pattern to the LED
+        """Add the steps of a Pattern to the LED, after any already queued
 
         Args:
             pattern: A defined Pattern to use on the LED
             kwargs:
                 loop_count: how many times to loop the pattern, default 1
         """
-        if self._active:
-            print("cannot add pattern while active")
-            return
-        self._steps += pattern.generate(self._current, kwargs.get("num_loops", 1))
+        self.buffer.add_pattern(self.col, pattern, kwargs.get("num_loops", 1))
 
     def reset(self):
-        self._active = False
-        self._steps = []
-        self._step_num = 0
+        self.buffer.reset(self.col)
         self.strip.setPixelColor(self.idx, 0)
 
     def start(self):
-        self._active = True
-        self._step_num = 0
+        self.buffer.start(self.col)
 
     def stop(self):
-        self._active = False
+        self.buffer.stop(self.col)
 
     def __iter__(self):
         self.start()
         return self
 
     def __next__(self):
-        if self._step_num >= len(self._steps):
+        buf, col = self.buffer, self.col
+        if buf.cursor[col] >= buf.lengths[col]:
             self.stop()
-            self._step_num = 0
+            buf.cursor[col] = 0
             raise StopIteration
-        if self._active:
-            self._current = self._steps[self._step_num]
-            self._step_num += 1
+        if buf.active[col]:
+            return buf.step(col)
         return self._current
 
     def __str__(self) -> str:
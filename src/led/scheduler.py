@@ -0,0 +1,70 @@
+"""Fixed-rate frame timing"""
+
+import time
+
+
+class FrameScheduler:
+    """Deadline-based frame clock on ``time.monotonic()``.
+
+    Each frame has a deadline one period after the previous one, so time spent
+    rendering and in ``show()`` comes out of the sleep instead of adding to it.
+    When a frame overruns, ``wait`` returns immediately and reports how many
+    frames were missed so the caller can skip ahead instead of slowing down.
+    If it falls more than ``max_skip`` frames behind, the backlog is dropped
+    and the schedule restarts from now.
+    """
+
+    def __init__(self, fps: float = 20.0, max_skip: int = 5, clock=time.monotonic):
+        self.fps = fps
+        self.period = 1.0 / fps
+        self.max_skip = max_skip
+        self.clock = clock
+        self.frames = 0
+        self.late_frames = 0
+        self.skipped_frames = 0
+        self._deadline = None
+
+    def set_rate(self, fps: float, max_skip: int):
+        """Change the frame rate; the next deadline is one new period away."""
+        self.fps = fps
+        self.period = 1.0 / fps
+        self.max_skip = max_skip
+
+    def start(self):
+        """(Re)anchor the schedule on the current time."""
+        self._deadline = self.clock()
+
+    def wait(self) -> int:
+        """Sleep until the next frame is due.
+
+        Returns:
+            How many frames the show should advance: 1 when on time, more when
+            frames had to be skipped to catch up.
+        """
+        if self._deadline is None:
+            self.start()
+        self._deadline += self.period
+        self.frames += 1
+
+        now = self.clock()
+        if now < self._deadline:
+            time.sleep(self._deadline - now)
+            return 1
+
+        self.late_frames += 1
+        behind = int((now - self._deadline) // self.period)
+        if behind > self.max_skip:
+            behind = self.max_skip
+            self._deadline = now
+        else:
+            self._deadline += behind * self.period
+        self.skipped_frames += behind
+        return 1 + behind
+
+    def stats(self) -> dict:
+        return {
+            "fps": self.fps,
+            "frames": self.frames,
+            "late_frames": self.late_frames,
+            "skipped_frames": self.skipped_frames,
+        }
@@ -0,0 +1,239 @@
+"""JSON command server for driving the lights from other programs"""
+
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Optional
+
+from .compositor import BLEND_MODES, clamp_opacity
+from .controller import COLOR_MAP, Controller
+
+# Commands that are run as key binding actions, see Controller.run_action
+ACTIONS = ("trigger", "trigger_all", "queue", "immediate")
+
+
+class CommandError(Exception):
+    pass
+
+
+class ControlServer:
+    """Newline-delimited JSON commands over a Unix socket or localhost TCP.
+
+    Each line holds one command object, or a list of them. A list is applied
+    as one batch, so everything in it starts on the same frame. Clients may
+    send many lines without waiting for replies; every line gets exactly one
+    reply line, in order, echoing the ``id`` of each command that had one.
+
+        {"id": 1, "cmd": "apply_animation", "target": "player_1", "animation": "Chase"}
+        [{"cmd": "clear_segment", "target": "ALL"}, {"cmd": "trigger_all"}]
+
+    Commands only queue work for the animation thread, so replies do not wait
+    for a frame to be rendered.
+    """
+
+    def __init__(
+        self,
+        controller: Controller,
+        path: Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+    ):
+        if path is None and port is None:
+            raise ValueError("ControlServer needs a socket path or a TCP port")
+        self.controller = controller
+        self.path = path
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._started = threading.Event()
+        self._error: Optional[Exception] = None
+
+    @property
+    def address(self) -> str:
+        if self.path is not None:
+            return self.path
+        return f"{self.host}:{self.port}"
+
+    async def start(self):
+        if self.path is not None:
+            if os.path.exists(self.path):
+                os.unlink(self.path)  # Left behind by a previous run
+            self._server = await asyncio.start_unix_server(
+                self._handle, path=self.path
+            )
+        else:
+            self._server = await asyncio.start_server(
+                self._handle, self.host, self.port
+            )
+            if not self.port:
+                self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self.start()
+        self._loop = asyncio.get_running_loop()
+        self._started.set()
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._server.close()
+            if self.path is not None and os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def start_thread(self) -> threading.Thread:
+        """Serve on a daemon thread next to the animation thread.
+
+        Raises the error that stopped the server from starting, such as an
+        address already in use.
+        """
+        t = threading.Thread(target=self._serve_thread)
+        t.daemon = True
+        t.start()
+        if not self._started.wait(5):
+            raise RuntimeError(f"Command server did not start on {self.address}")
+        if self._error is not None:
+            raise self._error
+        return t
+
+    def _serve_thread(self):
+        try:
+            asyncio.run(self.serve_forever())
+        except Exception as e:
+            self._error = e
+            self._started.set()
+
+    def stop(self):
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                writer.write(self.handle_line(line))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def handle_line(self, line: bytes) -> bytes:
+        """Execute one request line and return its reply line."""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            reply: Any = {"ok": False, "error": f"Invalid JSON: {e}"}
+        else:
+            if isinstance(request, list):
+                with self.controller.batch():
+                    reply = [self.execute(command) for command in request]
+            else:
+                reply = self.execute(request)
+        return json.dumps(reply).encode() + b"\n"
+
+    def execute(self, command: Any) -> dict:
+        """Execute one command object and return its reply."""
+        if not isinstance(command, dict):
+            return {"ok": False, "error": "Command must be a JSON object"}
+
+        reply: dict = {}
+        if "id" in command:
+            reply["id"] = command["id"]
+        name = command.get("cmd")
+        handler = getattr(self, f"_cmd_{name}", None) if name else None
+        if name in ACTIONS:
+            handler = self._action
+        if handler is None:
+            reply.update(ok=False, error=f"Unknown command: {name}")
+            return reply
+
+        try:
+            result = handler(command)
+        except CommandError as e:
+            reply.update(ok=False, error=str(e))
+        except (KeyError, TypeError, ValueError) as e:
+            reply.update(ok=False, error=f"Bad {name} command: {e!r}")
+        else:
+            reply["ok"] = True
+            if result is not None:
+                reply["result"] = result
+        return reply
+
+    def _targets(self, target: str) -> list[str]:
+        if target == "ALL":
+            return list(self.controller.segments)
+        if target not in self.controller.segments:
+            raise CommandError(f"Unknown segment: {target}")
+        return [target]
+
+    def _cmd_ping(self, command: dict):
+        return "pong"
+
+    def _cmd_segments(self, command: dict):
+        return {
+            name: [segment.begin_led, segment.end_led]
+            for name, segment in self.controller.segments.items()
+        }
+
+    def _cmd_segment_at(self, command: dict):
+        return self.controller.segment_at(int(command["led"]))
+
+    def _cmd_stats(self, command: dict):
+        return self.controller.get_stats()
+
+    def _cmd_apply_animation(self, command: dict):
+        names = self._targets(command["target"])
+        with self.controller.batch():
+            for name in names:
+                applied = self.controller.apply_animation(
+                    name,
+                    command["animation"],
+                    command.get("params"),
+                    command.get("layer"),
+                )
+                if not applied:
+                    raise CommandError(f"Unknown animation: {command['animation']}")
+
+    def _cmd_clear_segment(self, command: dict):
+        target = command.get("target", "ALL")
+        self._targets(target)
+        self.controller.clear_segment(target, command.get("layer"))
+
+    def _cmd_set_layer(self, command: dict):
+        blend, opacity = command.get("blend"), command.get("opacity")
+        if blend is not None and blend not in BLEND_MODES:
+            raise CommandError(f"Unknown blend mode: {blend}")
+        if opacity is not None:
+            opacity = clamp_opacity(opacity)
+        with self.controller.batch():
+            for name in self._targets(command["target"]):
+                self.controller.set_layer(name, command["layer"], blend, opacity)
+
+    def _cmd_set_color_range(self, command: dict):
+        color = command["color"]
+        color = COLOR_MAP.get(color, color)
+        if not isinstance(color, int):
+            raise CommandError(f"Unknown color: {color}")
+        self.controller.set_color_range(
+            int(command["start"]), int(command["end"]), color
+        )
+
+    def _cmd_set_brightness(self, command: dict):
+        self.controller.set_brightness(int(command["brightness"]))
+
+    def _cmd_switch_layout(self, command: dict):
+        if not self.controller.switch_layout(command["layout"]):
+            raise CommandError(f"Unknown layout: {command['layout']}")
+
+    def _cmd_key(self, command: dict):
+        if not self.controller.handle_command(command["key"]):
+            raise CommandError(f"Unbound key: {command['key']}")
+
+    def _action(self, command: dict):
+        self.controller.run_action({**command, "action": command["cmd"]})
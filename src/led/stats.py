@@ -0,0 +1,149 @@
+"""Per-frame timing statistics for the animation loop"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+# Histogram bucket edges, in milliseconds
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250]
+
+
+class RollingHistogram:
+    """The last ``window`` samples of a value, summarized on demand.
+
+    Recording is a single store into a ring buffer so it is cheap enough for
+    the hot path; percentiles and bucket counts are only computed when read.
+    """
+
+    def __init__(self, window: int = 600, buckets: list[float] = BUCKETS_MS):
+        self._samples = np.zeros(window, dtype=np.float64)
+        self._count = 0
+        self.buckets = buckets
+
+    def __len__(self) -> int:
+        return min(self._count, len(self._samples))
+
+    def record(self, value: float):
+        self._samples[self._count % len(self._samples)] = value
+        self._count += 1
+
+    @property
+    def last(self) -> float:
+        if not self._count:
+            return 0.0
+        return float(self._samples[(self._count - 1) % len(self._samples)])
+
+    def values(self) -> np.ndarray:
+        return self._samples[: len(self)]
+
+    def summary(self) -> dict:
+        values = self.values()
+        if not len(values):
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        counts = np.bincount(
+            np.searchsorted(self.buckets, values), minlength=len(self.buckets) + 1
+        )
+        return {
+            "count": len(values),
+            "mean": float(values.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(values.max()),
+            "buckets": self.buckets,
+            "counts": counts.tolist(),
+        }
+
+
+class FrameStats:
+    """Rolling render, show, sleep and jitter times plus active pixel counts.
+
+    Times are recorded in seconds and reported in milliseconds.
+    """
+
+    def __init__(self, window: int = 600):
+        self.window = window
+        self.render = RollingHistogram(window)
+        self.show = RollingHistogram(window)
+        self.sleep = RollingHistogram(window)
+        self.jitter = RollingHistogram(window)
+        self.wake = RollingHistogram(window)  # Idle thread wake-up latency
+        self.key = RollingHistogram(window)  # Key press to first frame shown
+        self.active_pixels: Dict[str, RollingHistogram] = {}
+        self.idle_frames = 0  # Frames where nothing changed and show() was skipped
+
+    def record_frame(
+        self, render: float, show: Optional[float], sleep: float, jitter: float
+    ):
+        """Record one frame; ``show`` is None when another thread records it."""
+        self.render.record(render * 1000)
+        if show is not None:
+            self.record_show(show)
+        self.sleep.record(sleep * 1000)
+        self.jitter.record(abs(jitter) * 1000)
+
+    def record_show(self, show: float):
+        self.show.record(show * 1000)
+
+    def record_wake(self, latency: float):
+        self.wake.record(latency * 1000)
+
+    def record_key(self, latency: float):
+        self.key.record(latency * 1000)
+
+    def record_active(self, segment: str, count: int):
+        if segment not in self.active_pixels:
+            self.active_pixels[segment] = RollingHistogram(self.window, buckets=[])
+        self.active_pixels[segment].record(count)
+
+    def snapshot(self) -> dict:
+        return {
+            "idle_frames": self.idle_frames,
+            "render_ms": self.render.summary(),
+            "show_ms": self.show.summary(),
+            "sleep_ms": self.sleep.summary(),
+            "jitter_ms": self.jitter.summary(),
+            "wake_ms": self.wake.summary(),
+            "key_ms": self.key.summary(),
+            "active_pixels": {
+                name: {"last": int(h.last), "max": int(h.values().max(initial=0))}
+                for name, h in self.active_pixels.items()
+            },
+        }
+
+
+def format_report(snapshot: dict) -> str:
+    """Render a stats snapshot as a plain text table."""
+    lines = []
+    scheduler = snapshot.get("scheduler")
+    if scheduler:
+        lines.append(
+            f"Frames: {scheduler['frames']} at {scheduler['fps']} fps target "
+            f"(late {scheduler['late_frames']}, skipped {scheduler['skipped_frames']}, "
+            f"idle {snapshot['idle_frames']})"
+        )
+
+    lines.append(f"{'':<10}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name in ("render", "show", "sleep", "jitter", "wake", "key"):
+        summary = snapshot[f"{name}_ms"]
+        if not summary["count"]:
+            lines.append(f"{name:<10}{'-':>9}")
+            continue
+        lines.append(
+            f"{name:<10}"
+            + "".join(f"{summary[k]:>9.2f}" for k in ("p50", "p95", "p99", "max"))
+        )
+
+    if snapshot["active_pixels"]:
+        lines.append("Active pixels (last / max):")
+        for name, counts in snapshot["active_pixels"].items():
+            lines.append(f"  {name:<20}{counts['last']:>6} / {counts['max']}")
+
+    cache = snapshot.get("sequence_cache")
+    if cache:
+        lines.append(
+            f"Sequence cache: {cache['entries']}/{cache['maxsize']} entries, "
+            f"{cache['hits']} hits, {cache['misses']} misses"
+        )
+    return "\n".join(lines)
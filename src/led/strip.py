@@ -1,7 +1,11 @@
-from dataclasses import dataclass, field
+from collections.abc import Sequence
+from dataclasses import dataclass, field, replace
 from enum import Enum
+from typing import Dict, Optional
 import sys
 
+import numpy as np
+
 try:
     from rpi_ws281x import Color, PixelStrip
 except ImportError:
@@ -13,27 +17,167 @@ except ImportError:
         return 0
 
 
+from .compositor import Layer, composite
+from .framebuffer import FrameBuffer
+from .output import FrameOutput
+from .patterns import Pattern
+from .pixel import Pixel
 from .table import TablePosition
 
 
-@dataclass
+class SegmentPixels(Sequence):
+    """The LEDs of a segment as Pixel objects, each made only when asked for."""
+
+    __slots__ = ("segment",)
+
+    def __init__(self, segment: "StripSegment"):
+        self.segment = segment
+
+    def __len__(self) -> int:
+        return len(self.segment.buffer)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("pixel index out of range")
+        segment = self.segment
+        return Pixel(segment.strip, segment.begin_led + i, segment.buffer, i)
+
+
+@dataclass(slots=True)
 class StripSegment:
     begin_led: int
     end_led: int
     table_position: TablePosition = field(default_factory=lambda: TablePosition.NO_SEAT)
-    pixels: list = field(default_factory=list, repr=False)
-
-    def animate(self):
-        """Advance the state of all pixels in this segment."""
-        for pixel in self.pixels:
-            if pixel._active:
-                try:
-                    next(pixel)
-                    pixel.strip.setPixelColor(pixel.idx, pixel._current)
-                except StopIteration:
-                    pass  # Pixel finished its pattern
-
-    def clear(self):
-        """Turn off all pixels in this segment."""
-        for pixel in self.pixels:
-            pixel.reset()
+    strip: Optional[PixelStrip] = field(default=None, repr=False)
+    buffer: FrameBuffer = field(init=False, repr=False)
+    layers: Dict[str, Layer] = field(init=False, repr=False)
+    # Last composited colors, kept while any layer is showing
+    _frame: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        # Pixel state is held column-wise in the buffer, not per Pixel object
+        self.buffer = FrameBuffer(self.end_led - self.begin_led + 1)
+        self.layers = {}
+
+    @property
+    def pixels(self) -> SegmentPixels:
+        """The segment's LEDs as Pixel views onto its buffer."""
+        return SegmentPixels(self)
+
+    @property
+    def active_count(self) -> int:
+        """Number of pixels currently running a pattern, on any layer."""
+        active = self.buffer.active
+        for layer in self.layers.values():
+            active = active | layer.buffer.active
+        return int(np.count_nonzero(active))
+
+    @property
+    def busy(self) -> bool:
+        """Whether the segment has anything left to render or push."""
+        return any(buffer.dirty or buffer.active.any() for buffer in self._buffers())
+
+    def _buffers(self):
+        yield self.buffer
+        for layer in self.layers.values():
+            yield layer.buffer
+
+    def set_layer(
+        self, name: str, blend: Optional[str] = None, opacity: Optional[float] = None
+    ) -> Layer:
+        """Get a layer, creating it on top of the others if needed."""
+        changes = {}
+        if blend is not None:
+            changes["blend"] = blend
+        if opacity is not None:
+            changes["opacity"] = opacity
+        layer = self.layers.get(name) or Layer(FrameBuffer(len(self.buffer)))
+        self.layers[name] = layer = replace(layer, **changes)
+        return layer
+
+    def apply(self, animation, layer: Optional[str] = None):
+        """Replace whatever is running with an Animation (or a bare Pattern).
+
+        Pixels keep the color they are showing and the new animation starts
+        from there. With ``layer``, the animation runs on that layer instead
+        and the rest of the segment keeps going underneath.
+        """
+        buffer = self.buffer if layer is None else self.set_layer(layer).buffer
+        cols = np.arange(len(buffer))
+        buffer.cut()
+        if isinstance(animation, Pattern):
+            buffer.add_pattern(cols, animation)
+        else:
+            animation.queue(buffer, cols, cols, len(buffer))
+        buffer.start()
+
+    def fill(self, cols: np.ndarray, color: int, out: Optional[FrameOutput] = None):
+        """Stop the pixels at ``cols`` and hold them at one color."""
+        self.buffer.cut(cols)
+        self.buffer.current[cols] = color
+        self.buffer.dirty = True
+        if self._frame is not None:
+            return  # Layered: the next composite picks the new colors up
+        if out is not None:
+            out.write(self.begin_led + cols, self.buffer.current[cols])
+        else:
+            for col in cols.tolist():
+                self.strip.setPixelColor(self.begin_led + col, color)
+
+    def animate(self, frames: int = 1, out: Optional[FrameOutput] = None) -> bool:
+        """Advance the state of all pixels in this segment.
+
+        Only pixels whose color changed are written, into ``out`` when given
+        or straight to the strip otherwise.
+
+        Returns:
+            Whether anything in the segment changed since the last call.
+        """
+        layered = self._frame is not None or any(
+            layer.buffer.active.any() for layer in self.layers.values()
+        )
+        if layered:
+            cols, colors = self._composite(frames)
+        else:
+            cols, colors = self.buffer.advance(frames)
+        if out is not None:
+            out.write(self.begin_led + cols, colors)
+        else:
+            for col, color in zip(cols.tolist(), colors.tolist()):
+                self.strip.setPixelColor(self.begin_led + col, color)
+        dirty = False
+        for buffer in self._buffers():
+            dirty |= buffer.dirty
+            buffer.dirty = False
+        return dirty or (layered and bool(len(cols)))
+
+    def _composite(self, frames: int) -> tuple[np.ndarray, np.ndarray]:
+        """Advance every layer and blend them into one set of changed pixels."""
+        shown = self._frame if self._frame is not None else self.buffer.current.copy()
+        for buffer in self._buffers():
+            buffer.advance(frames)
+        frame = composite(self.buffer.current, self.layers.values())
+        cols = np.flatnonzero(frame != shown)
+        # Once no layer is showing, the base buffer is the frame again
+        covered = any(layer.buffer.active.any() for layer in self.layers.values())
+        self._frame = frame if covered else None
+        return cols, frame[cols]
+
+    def clear(self, out: Optional[FrameOutput] = None, layer: Optional[str] = None):
+        """Turn off all pixels in this segment, or stop one of its layers."""
+        if layer is not None:
+            if layer in self.layers:
+                self.layers[layer].buffer.reset()
+            return
+        for buffer in self._buffers():
+            buffer.reset()
+        self._frame = None
+        if out is not None:
+            out.fill(self.begin_led, self.end_led, 0)
+        elif self.strip is not None:
+            for idx in range(self.begin_led, self.end_led + 1):
+                self.strip.setPixelColor(idx, 0)
@@ -0,0 +1,52 @@
+"""Picking up config file edits while the show runs"""
+
+import threading
+from typing import Callable, Optional
+
+from .config import ConfigManager
+
+
+class ConfigWatcher:
+    """Polls a ConfigManager's file and calls back when it was edited.
+
+    A stat() per poll is all an unchanged file costs, which keeps this
+    dependency free (no inotify) and working on any filesystem.
+    """
+
+    def __init__(
+        self,
+        manager: ConfigManager,
+        on_change: Callable[[], None],
+        interval: float = 1.0,
+    ):
+        self.manager = manager
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        """Reload the config if it changed, and report it. Returns whether it did."""
+        if not self.manager.reload():
+            return False
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"Config reload failed: {e}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> threading.Thread:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None